@@ -0,0 +1,296 @@
+# ==========================================
+# Tier AutoTrader - Vectorized Target Evaluation
+# ==========================================
+# Server-side port of the decision logic in js/autotrader.js, evaluated for
+# every coin at once as NumPy arrays over a price snapshot:
+#   - Only coins with targets, in an active tier, off cooldown, with a price
+#   - BUY when price <= buy target, else SELL when price >= sell target
+#   - Buy size  = tier allocation% of the USDC balance, keeping MIN_USDC_RESERVE
+#   - Sell size = tier allocation% x SELL_RATIO of the coin balance
+#   - After a trade: 24h cooldown; a buy moves the buy target down from the
+#     fill price, a sell moves the sell target up (the other target stays)
+#
+# Unlike the browser loop, buys in the same check are charged against the
+# reserve cumulatively (in coin order), so several simultaneous buys can
+# never take USDC below the reserve together.
+#
+# State comes from the trader_state document (autoTiers,
+# autoTierAssignments, autoCooldowns, autoActive); with no saved
+# assignments, held coins get the JS defaults. Nothing here touches the
+# database or places orders; callers decide what to do with the decisions.
+# ==========================================
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+COOLDOWN_HOURS = 24
+COOLDOWN_MS = COOLDOWN_HOURS * 60 * 60 * 1000
+MIN_USDC_RESERVE = 100.0
+SELL_RATIO = 0.833  # Sell 83% of buy amount (accumulate)
+
+DEFAULT_TIERS = {
+    "tier1": {"deviation": 2, "allocation": 10},
+    "tier2": {"deviation": 5, "allocation": 5},
+    "tier3": {"deviation": 8, "allocation": 3},
+}
+
+DEFAULT_T1 = ["BTC", "ETH", "SOL", "BNB", "XRP"]
+
+HOLD, BUY, SELL = 0, 1, -1
+
+
+@dataclass
+class TraderArrays:
+    """Per-coin trader state as aligned arrays (index i is coins[i])"""
+    coins: List[str]
+    tier: np.ndarray            # int, 0 = unassigned (uses tier2 settings, like the JS)
+    deviation: np.ndarray       # fraction, e.g. 0.02
+    allocation: np.ndarray      # fraction, e.g. 0.10
+    buy_target: np.ndarray      # NaN = no target
+    sell_target: np.ndarray     # NaN = no target
+    cooldown_until: np.ndarray  # epoch ms, 0 = none
+    tier_active: np.ndarray     # bool
+
+    def targets(self) -> Dict[str, Dict[str, float]]:
+        """Targets in the autoActive.targets document format"""
+        out = {}
+        for i, coin in enumerate(self.coins):
+            if not np.isnan(self.buy_target[i]) and not np.isnan(self.sell_target[i]):
+                out[coin] = {"buy": float(self.buy_target[i]), "sell": float(self.sell_target[i])}
+        return out
+
+    def cooldowns(self, now_ms: float) -> Dict[str, int]:
+        """Unexpired cooldowns in the autoCooldowns document format"""
+        return {
+            coin: int(self.cooldown_until[i])
+            for i, coin in enumerate(self.coins)
+            if self.cooldown_until[i] > now_ms
+        }
+
+
+def default_state(coins: List[str]) -> Dict:
+    """
+    Trader state with every tier running and coins assigned the way
+    _ensureDefaultAssignments() does (blue chips tier 1, the rest tier 2).
+    """
+    return {
+        "autoTiers": dict(DEFAULT_TIERS),
+        "autoTierAssignments": {c: 1 if c in DEFAULT_T1 else 2 for c in coins},
+        "autoCooldowns": {},
+        "autoActive": {"isActive": True, "tierActive": {"1": True, "2": True, "3": True}, "targets": {}},
+    }
+
+
+def load_trader_arrays(state: Dict, coins: Optional[List[str]] = None) -> TraderArrays:
+    """
+    Build TraderArrays from a trader_state document (as get_trader_state()
+    returns it). coins fixes the column order; default is every coin with a
+    target or tier assignment, sorted.
+    """
+    tiers = {**DEFAULT_TIERS, **(state.get("autoTiers") or {})}
+    assignments = state.get("autoTierAssignments") or {}
+    cooldowns = state.get("autoCooldowns") or {}
+    active = state.get("autoActive") or {}
+    targets = active.get("targets") or active.get("basePrices") or {}
+    tier_active_map = active.get("tierActive") or {}
+    is_active = bool(active.get("isActive"))
+
+    if coins is None:
+        coins = sorted(set(targets) | set(assignments))
+    n = len(coins)
+
+    tier = np.array([int(assignments.get(c, 0) or 0) for c in coins], dtype=np.int64)
+    settings = [tiers.get(f"tier{t}") if 1 <= t <= 3 else None for t in tier]
+    settings = [s or tiers["tier2"] for s in settings]  # JS getSettings() fallback
+    deviation = np.array([s.get("deviation", 0) for s in settings], dtype=np.float64) / 100.0
+    allocation = np.array([s.get("allocation", 0) for s in settings], dtype=np.float64) / 100.0
+
+    buy_target = np.full(n, np.nan)
+    sell_target = np.full(n, np.nan)
+    for i, coin in enumerate(coins):
+        tgt = targets.get(coin)
+        if isinstance(tgt, dict) and tgt.get("buy") and tgt.get("sell"):
+            buy_target[i] = tgt["buy"]
+            sell_target[i] = tgt["sell"]
+        elif isinstance(tgt, (int, float)) and tgt > 0:
+            # Old format: a base price
+            buy_target[i] = tgt * (1 - deviation[i])
+            sell_target[i] = tgt * (1 + deviation[i])
+
+    cooldown_until = np.array([float(cooldowns.get(c, 0) or 0) for c in coins], dtype=np.float64)
+
+    # tierActive keys arrive as strings from JSON ("1") or ints
+    active_tiers = {int(k) for k, v in tier_active_map.items() if v}
+    if is_active and not tier_active_map:
+        # Old format: every tier that has targets was active
+        active_tiers = {int(t) for t, b in zip(tier, buy_target) if not np.isnan(b)}
+    tier_active = np.array([is_active and int(t) in active_tiers for t in tier], dtype=bool)
+
+    return TraderArrays(coins, tier, deviation, allocation, buy_target,
+                        sell_target, cooldown_until, tier_active)
+
+
+def evaluate(arrays: TraderArrays, prices: np.ndarray, now_ms: float,
+             usdc_balance: float, balances: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Evaluate every coin against its targets in one vectorized pass.
+
+    prices:   current USD price per coin (NaN or <= 0 = no price)
+    balances: coin holdings per coin (for sell sizing)
+    Returns arrays: action (BUY/SELL/HOLD), quantity, amount (USD),
+    new_buy_target, new_sell_target, new_cooldown_until.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    balances = np.asarray(balances, dtype=np.float64)
+
+    eligible = (
+        arrays.tier_active
+        & ~np.isnan(arrays.buy_target)
+        & (arrays.cooldown_until <= now_ms)
+        & (prices > 0)
+    )
+    hit_buy = eligible & (prices <= arrays.buy_target)
+    hit_sell = eligible & ~hit_buy & (prices >= arrays.sell_target)
+
+    # Buys: allocation% of the (pre-check) USDC balance, like the JS loop,
+    # but the reserve is checked against the running total of triggered buys,
+    # so once one would breach it every later one in coin order is skipped
+    buy_amount = np.where(hit_buy, arrays.allocation * usdc_balance, 0.0)
+    buy_ok = hit_buy & (usdc_balance - np.cumsum(buy_amount) >= MIN_USDC_RESERVE)
+    buy_amount = np.where(buy_ok, buy_amount, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        buy_qty = np.where(buy_ok, np.round(buy_amount / prices, 8), 0.0)
+
+    sell_qty = np.where(hit_sell, np.round(arrays.allocation * SELL_RATIO * balances, 8), 0.0)
+    sell_ok = hit_sell & (sell_qty > 0)
+    sell_qty = np.where(sell_ok, sell_qty, 0.0)
+    sell_amount = np.where(sell_ok, sell_qty * prices, 0.0)
+
+    action = np.where(buy_ok, BUY, np.where(sell_ok, SELL, HOLD))
+    traded = action != HOLD
+
+    return {
+        "action": action,
+        "quantity": buy_qty + sell_qty,
+        "amount": buy_amount + sell_amount,
+        "new_buy_target": np.where(buy_ok, prices * (1 - arrays.deviation), arrays.buy_target),
+        "new_sell_target": np.where(sell_ok, prices * (1 + arrays.deviation), arrays.sell_target),
+        "new_cooldown_until": np.where(traded, now_ms + COOLDOWN_MS, arrays.cooldown_until),
+    }
+
+
+def apply_decisions(arrays: TraderArrays, result: Dict[str, np.ndarray]):
+    """Move targets and cooldowns in place as if every decision was filled"""
+    arrays.buy_target = result["new_buy_target"]
+    arrays.sell_target = result["new_sell_target"]
+    arrays.cooldown_until = result["new_cooldown_until"]
+
+
+def evaluate_snapshot(state: Dict, prices: Dict[str, float], usdc_balance: float,
+                      balances: Dict[str, float], now_ms: float) -> Dict:
+    """
+    JSON-friendly wrapper for the API / scheduler: evaluate a trader_state
+    document against one price snapshot. Returns the trade decisions plus
+    the targets and cooldowns to persist if they are all executed.
+    """
+    if not state.get("autoTierAssignments"):
+        # Same fallback as _ensureDefaultAssignments(): every held coin,
+        # blue chips tier 1, the rest tier 2
+        held = [c for c, b in balances.items() if b and b > 0 and c not in ("AUD", "USDC")]
+        state = {**state, "autoTierAssignments": default_state(held)["autoTierAssignments"]}
+
+    arrays = load_trader_arrays(state)
+    price_arr = np.array([prices.get(c, np.nan) or np.nan for c in arrays.coins], dtype=np.float64)
+    balance_arr = np.array([balances.get(c, 0.0) or 0.0 for c in arrays.coins], dtype=np.float64)
+
+    result = evaluate(arrays, price_arr, now_ms, usdc_balance, balance_arr)
+
+    decisions = []
+    for i in np.flatnonzero(result["action"] != HOLD):
+        side = "BUY" if result["action"][i] == BUY else "SELL"
+        decisions.append({
+            "coin": arrays.coins[i],
+            "side": side,
+            "quantity": float(result["quantity"][i]),
+            "price": float(price_arr[i]),
+            "amount": float(result["amount"][i]),
+            "tier": int(arrays.tier[i]),
+            "target": float(arrays.buy_target[i] if side == "BUY" else arrays.sell_target[i]),
+        })
+
+    apply_decisions(arrays, result)
+    return {
+        "decisions": decisions,
+        "evaluated": len(arrays.coins),
+        "targets": arrays.targets(),
+        "cooldowns": arrays.cooldowns(now_ms),
+    }
+
+
+def backtest(state: Dict, coins: List[str], timestamps_ms: np.ndarray, prices: np.ndarray,
+             usdc_balance: float, balances: Optional[np.ndarray] = None,
+             fee_rate: float = 0.0) -> Dict:
+    """
+    Replay a recorded price series through the engine.
+
+    timestamps_ms: shape (T,), ascending check times
+    prices:        shape (T, C), column j is coins[j] (NaN = no quote)
+    balances:      starting coin holdings, shape (C,)
+    Each tick is one vectorized evaluate() over all coins; fills are assumed
+    at the tick price, with USDC and holdings updated between ticks.
+    """
+    arrays = load_trader_arrays(state, coins)
+    timestamps_ms = np.asarray(timestamps_ms, dtype=np.float64)
+    prices = np.asarray(prices, dtype=np.float64)
+    holdings = np.zeros(len(coins)) if balances is None else np.asarray(balances, dtype=np.float64).copy()
+    usdc = float(usdc_balance)
+
+    # Coins with no saved target start from their first quote, as startTier() does
+    first_idx = np.argmax(~np.isnan(prices), axis=0)
+    first_quote = prices[first_idx, np.arange(len(coins))]
+    missing = np.isnan(arrays.buy_target) & ~np.isnan(first_quote)
+    arrays.buy_target = np.where(missing, first_quote * (1 - arrays.deviation), arrays.buy_target)
+    arrays.sell_target = np.where(missing, first_quote * (1 + arrays.deviation), arrays.sell_target)
+
+    trade_tick, trade_coin, trade_side, trade_qty, trade_price = [], [], [], [], []
+    equity = np.empty(len(timestamps_ms))
+
+    for t in range(len(timestamps_ms)):
+        row = prices[t]
+        result = evaluate(arrays, row, timestamps_ms[t], usdc, holdings)
+        action = result["action"]
+        if action.any():
+            buys = action == BUY
+            sells = action == SELL
+            qty = result["quantity"]
+            amount = result["amount"]
+            usdc -= (amount[buys] * (1 + fee_rate)).sum()
+            usdc += (amount[sells] * (1 - fee_rate)).sum()
+            holdings = holdings + np.where(buys, qty, 0.0) - np.where(sells, qty, 0.0)
+            idx = np.flatnonzero(action != HOLD)
+            trade_tick.extend([t] * len(idx))
+            trade_coin.extend(idx.tolist())
+            trade_side.extend(action[idx].tolist())
+            trade_qty.extend(qty[idx].tolist())
+            trade_price.extend(row[idx].tolist())
+            apply_decisions(arrays, result)
+        equity[t] = usdc + np.nansum(holdings * row)
+
+    trades = [
+        {
+            "timestamp": int(timestamps_ms[tick]),
+            "coin": coins[c],
+            "side": "BUY" if side == BUY else "SELL",
+            "quantity": q,
+            "price": p,
+        }
+        for tick, c, side, q, p in zip(trade_tick, trade_coin, trade_side, trade_qty, trade_price)
+    ]
+    return {
+        "trades": trades,
+        "finalUsdc": usdc,
+        "finalHoldings": {c: float(h) for c, h in zip(coins, holdings)},
+        "equity": equity,
+    }
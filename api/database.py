@@ -8,40 +8,170 @@
 #   - On deposit: sharesIssued = depositAmount / currentNAV
 #   - User value = userShares x currentNAV
 #   - P&L = currentValue - totalDeposited
+#
+# Collections come from a storage backend (see storage.py): MongoDB by
+# default, or the in-memory engine with FLUB_STORAGE=memory.
 # ==========================================
 
 import os
+import csv
+import math
+import logging
+import io
+import json
+import heapq
+import base64
+import time
 from datetime import datetime
-from typing import Optional, Dict, List
-from pymongo import MongoClient
+from typing import Optional, Dict, List, Iterator
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.read_preferences import Primary, Secondary, SecondaryPreferred, Nearest
 from pymongo.errors import DuplicateKeyError
 import base58
 from nacl.signing import VerifyKey
 from nacl.exceptions import BadSignatureError
+from metrics import command_listener
+from storage import Storage, MongoStorage, MemoryStorage
+
+logger = logging.getLogger("flub.database")
 
 # MongoDB connection
 MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
-DB_NAME = "flub"
+DB_NAME = os.getenv("MONGODB_DB", "flub")
 
 # Admin wallet addresses (set via env var, comma-separated)
 ADMIN_WALLETS = [w.strip() for w in os.getenv("ADMIN_WALLETS", "").split(",") if w.strip()]
+# Set for O(1) membership checks; the list stays for Mongo $nin queries
+ADMIN_WALLET_SET = frozenset(ADMIN_WALLETS)
+
+# Storage backend: "mongo" (default) or "memory"
+STORAGE_BACKEND = os.getenv("FLUB_STORAGE", "mongo")
+
+# Bound by use_storage() below
+storage = None
+client = None
+db = None
+users_collection = None
+trades_collection = None
+deposits_collection = None
+withdrawals_collection = None
+trader_state_collection = None
+pool_state_collection = None
+
+# ── Read Routing ─────────────────────────────────────────────────────────────
+# Heavy read-only functions can run on replica set secondaries so they don't
+# compete with deposit/trade writes on the primary. Reads that must see the
+# caller's own writes (position right after a deposit, anything that then
+# writes) are never listed here and always use the primary. So does the
+# pool document: it's a single _id lookup, and NAV = poolValue / totalShares
+# is wrong for every row if totalShares lags a fresh deposit. The ledger
+# export too: a checkpoint taken on a lagging secondary can be past rows
+# not yet replicated, and resuming from it would skip them for good.
+# Override per function with READ_ROUTES="get_leaderboard=primary,...".
+# On a standalone mongod every mode falls back to the only member.
+
+READ_MAX_STALENESS_SECONDS = max(90, int(os.getenv("READ_MAX_STALENESS_SECONDS", "90")))
+
+READ_ROUTES = {
+    "get_leaderboard": "secondaryPreferred",
+    "get_admin_stats": "secondaryPreferred",
+    "get_all_transactions_admin": "secondaryPreferred",
+    "get_all_active_users": "secondaryPreferred",
+}
+
+# Names _read() is called with; anything else in READ_ROUTES is a typo
+ROUTABLE_READS = frozenset(READ_ROUTES)
+
+_READ_PREFERENCES = {
+    "primary": lambda: Primary(),
+    "secondary": lambda: Secondary(max_staleness=READ_MAX_STALENESS_SECONDS),
+    "secondaryPreferred": lambda: SecondaryPreferred(max_staleness=READ_MAX_STALENESS_SECONDS),
+    "nearest": lambda: Nearest(max_staleness=READ_MAX_STALENESS_SECONDS),
+}
+
+_routed_collections = {}
+
+
+def _check_read_routes(routes: Dict[str, str]):
+    """Reject unknown functions and modes up front, not on first request"""
+    for route, mode in routes.items():
+        if route not in ROUTABLE_READS:
+            raise ValueError(
+                f"Unknown read route {route!r} "
+                f"(expected one of {', '.join(sorted(ROUTABLE_READS))})"
+            )
+        if mode not in _READ_PREFERENCES:
+            raise ValueError(
+                f"Unknown read preference {mode!r} for {route} "
+                f"(expected one of {', '.join(_READ_PREFERENCES)})"
+            )
+
+
+_env_routes = dict(
+    (name.strip(), mode.strip())
+    for name, mode in (pair.split("=", 1) for pair in os.getenv("READ_ROUTES", "").split(",") if "=" in pair)
+)
+_check_read_routes(_env_routes)
+READ_ROUTES.update(_env_routes)
+
+
+def _read(collection, route: str):
+    """collection with the read preference configured for `route`"""
+    key = (collection.name, route)
+    routed = _routed_collections.get(key)
+    if routed is None:
+        mode = READ_ROUTES.get(route, "primary")
+        routed = collection.with_options(read_preference=_READ_PREFERENCES[mode]())
+        _routed_collections[key] = routed
+    return routed
+
+
+def configure_read_routes(routes: Dict[str, str]):
+    """Change per-function read preferences at runtime (benchmarks, tests)"""
+    _check_read_routes(routes)
+    READ_ROUTES.update(routes)
+    _routed_collections.clear()
+
 
-client = MongoClient(MONGODB_URI)
-db = client[DB_NAME]
+# ── Storage Binding ──────────────────────────────────────────────────────────
 
-# Collections
-users_collection = db["users"]
-trades_collection = db["trades"]
-deposits_collection = db["deposits"]
-withdrawals_collection = db["withdrawals"]
-trader_state_collection = db["trader_state"]
-pool_state_collection = db["pool_state"]
+def use_storage(new_storage: Storage) -> Storage:
+    """
+    Point every function in this module at new_storage (and create its
+    indexes). Returns the previous backend so callers can restore it.
+    """
+    global storage, client, db
+    global users_collection, trades_collection, deposits_collection
+    global withdrawals_collection, trader_state_collection, pool_state_collection
+
+    previous = storage
+    storage = new_storage
+    client = getattr(new_storage, "client", None)
+    db = getattr(new_storage, "db", None)
+
+    users_collection = new_storage.collection("users")
+    trades_collection = new_storage.collection("trades")
+    deposits_collection = new_storage.collection("deposits")
+    withdrawals_collection = new_storage.collection("withdrawals")
+    trader_state_collection = new_storage.collection("trader_state")
+    pool_state_collection = new_storage.collection("pool_state")
+
+    _routed_collections.clear()
+    new_storage.ensure_indexes()
+    return previous
 
-# Create indexes
-users_collection.create_index("walletAddress", unique=True)
-trades_collection.create_index([("userId", 1), ("timestamp", -1)])
-deposits_collection.create_index([("userId", 1), ("timestamp", -1)])
-deposits_collection.create_index("txHash", unique=True)
+
+def _default_storage() -> Storage:
+    # command_listener attributes every command to the current HTTP request
+    if STORAGE_BACKEND == "memory":
+        return MemoryStorage(event_listeners=[command_listener])
+    if STORAGE_BACKEND != "mongo":
+        raise ValueError(f"Unknown FLUB_STORAGE backend: {STORAGE_BACKEND}")
+    return MongoStorage(MONGODB_URI, DB_NAME, event_listeners=[command_listener])
+
+
+use_storage(_default_storage())
 
 
 def verify_wallet_signature(wallet_address: str, message: str, signature: List[int]) -> bool:
@@ -62,7 +192,7 @@ def verify_wallet_signature(wallet_address: str, message: str, signature: List[i
         verify_key.verify(message_bytes, signature_bytes)
         return True
     except (BadSignatureError, Exception) as e:
-        print(f"Signature verification failed: {e}")
+        logger.info("Signature verification failed for %s: %s", wallet_address, e)
         return False
 
 
@@ -109,23 +239,26 @@ def register_user(wallet_address: str, signature: List[int], message: str) -> Di
 
 def is_admin(wallet_address: str) -> bool:
     """Check if a wallet address belongs to an admin"""
-    return wallet_address in ADMIN_WALLETS
+    return wallet_address in ADMIN_WALLET_SET
 
 
-def format_user_data(user: Dict) -> Dict:
-    """Format user data for API response"""
-    wallet = user["walletAddress"]
-    return {
-        "walletAddress": wallet,
-        "role": "admin" if is_admin(wallet) else "user",
-        "shares": user.get("shares", 0.0),
-        "allocation": user.get("allocation", 0.0),
-        "totalDeposited": user.get("totalDeposited", 0.0),
-        "totalWithdrawn": user.get("totalWithdrawn", 0.0),
-        "holdings": user.get("holdings", {}),
-        "joinedDate": user.get("joinedDate").isoformat() if user.get("joinedDate") else None,
-        "isActive": user.get("isActive", True)
-    }
+# API field -> function of the raw user document
+USER_FIELDS = {
+    "walletAddress": lambda u: u["walletAddress"],
+    "role": lambda u: "admin" if u["walletAddress"] in ADMIN_WALLET_SET else "user",
+    "shares": lambda u: u.get("shares", 0.0),
+    "allocation": lambda u: u.get("allocation", 0.0),
+    "totalDeposited": lambda u: u.get("totalDeposited", 0.0),
+    "totalWithdrawn": lambda u: u.get("totalWithdrawn", 0.0),
+    "holdings": lambda u: u.get("holdings", {}),
+    "joinedDate": lambda u: u.get("joinedDate").isoformat() if u.get("joinedDate") else None,
+    "isActive": lambda u: u.get("isActive", True),
+}
+
+
+def format_user_data(user: Dict, fields: List[str] = None) -> Dict:
+    """Format user data for API response (optionally only `fields`)"""
+    return {f: USER_FIELDS[f](user) for f in (fields or USER_FIELDS)}
 
 
 # ── Pool Share State ────────────────────────────────────────────────────────
@@ -136,9 +269,10 @@ def get_pool_state() -> Dict:
     doc = pool_state_collection.find_one({"_id": "pool"})
     if not doc:
         return {"totalShares": 0, "initialized": None}
+    initialized = doc.get("initialized")
     return {
         "totalShares": doc.get("totalShares", 0),
-        "initialized": doc.get("initialized")
+        "initialized": initialized.isoformat() if initialized else None
     }
 
 
@@ -188,14 +322,52 @@ def get_user_position(wallet_address: str, total_pool_value: float) -> Dict:
     Returns shares, NAV, currentValue, allocation%, totalDeposited.
     """
     user = users_collection.find_one({"walletAddress": wallet_address})
+    if not user:
+        return _format_position(None, 0, total_pool_value)
+
+    pool = get_pool_state()
+    return _format_position(user, pool["totalShares"], total_pool_value)
+
+
+# Upper bound on wallets per get_user_positions call (one $in query)
+MAX_POSITION_BATCH = 10000
+
+
+def get_user_positions(wallet_addresses: List[str], total_pool_value: float) -> Dict[str, Dict]:
+    """
+    Batch version of get_user_position: one $in query plus one pool read.
+    Returns {wallet_address: position} with the same shape per wallet;
+    unknown wallets get the same zero position as get_user_position.
+    """
+    wallets = list(dict.fromkeys(wallet_addresses))
+    if len(wallets) > MAX_POSITION_BATCH:
+        raise ValueError(f"At most {MAX_POSITION_BATCH} wallets per request")
+    if not wallets:
+        return {}
+
+    users = users_collection.find(
+        {"walletAddress": {"$in": wallets}},
+        {"_id": 0, "walletAddress": 1, "shares": 1, "totalDeposited": 1}
+    )
+    by_wallet = {u["walletAddress"]: u for u in users}
+
+    pool = get_pool_state()
+    total_shares = pool["totalShares"]
+
+    positions = {}
+    for wallet in wallets:
+        positions[wallet] = _format_position(by_wallet.get(wallet), total_shares, total_pool_value)
+    return positions
+
+
+def _format_position(user: Optional[Dict], total_shares: float, total_pool_value: float) -> Dict:
+    """Position dict for get_user_position(s); user=None means not registered"""
     if not user:
         return {
             "shares": 0, "nav": 1.0, "currentValue": 0,
             "allocation": 0, "totalDeposited": 0
         }
 
-    pool = get_pool_state()
-    total_shares = pool["totalShares"]
     user_shares = user.get("shares", 0.0)
     nav = total_pool_value / total_shares if total_shares > 0 else 1.0
 
@@ -317,6 +489,177 @@ def record_deposit(wallet_address: str, amount: float, tx_hash: str,
     }
 
 
+# ── Withdrawal with Share Redemption ────────────────────────────────────────
+# The user signs a withdrawal authorization whose text the server rebuilds
+# from (wallet, amount, currency, nonce, issuedAt), so a signature made for
+# login or for another amount never verifies. Each nonce can be redeemed
+# once (unique index on withdrawals.nonce). Redemption is admin-only, like
+# trades: NAV comes from the admin's pool valuation, never from the user.
+
+# How long a signed withdrawal authorization stays redeemable
+WITHDRAW_AUTH_TTL_SECONDS = int(os.getenv("WITHDRAW_AUTH_TTL_SECONDS", "3600"))
+
+# Withdrawal rows that count as money out (pending/failed ones don't)
+COMPLETED_WITHDRAWALS = {"status": "completed"}
+
+
+def withdrawal_message(wallet_address: str, amount: float, currency: str,
+                       nonce: str, issued_at: int) -> str:
+    """
+    Exact text the user signs to authorize one withdrawal.
+    issued_at: unix time in ms (JS Date.now()); amount is fixed to 6 dp
+    (JS amount.toFixed(6)).
+    """
+    return (
+        "Flub withdrawal authorization\n"
+        f"Wallet: {wallet_address}\n"
+        f"Amount: {amount:.6f} {currency}\n"
+        f"Nonce: {nonce}\n"
+        f"Issued: {issued_at}"
+    )
+
+
+def withdrawal_approval_message(wallet_address: str, amount: float, currency: str,
+                                total_pool_value: float, nonce: str) -> str:
+    """
+    Exact text an admin signs to approve one withdrawal at one pool value.
+    Numbers are fixed to 6 dp (JS value.toFixed(6)); nonce is the user's.
+    """
+    return (
+        "Flub withdrawal approval\n"
+        f"Wallet: {wallet_address}\n"
+        f"Amount: {amount:.6f} {currency}\n"
+        f"Pool value: {total_pool_value:.6f}\n"
+        f"Nonce: {nonce}"
+    )
+
+
+def record_withdrawal(wallet_address: str, amount: float, total_pool_value: float,
+                      signature: List[int], nonce: str, issued_at: int,
+                      admin_wallet: str, admin_signature: List[int],
+                      currency: str = "USDC", tx_hash: str = None) -> Dict:
+    """
+    Redeem a user's shares at the current NAV and record the withdrawal.
+
+    total_pool_value: admin's USD value of all pool assets BEFORE the payout
+                      leaves the pool.
+    signature: user's signature over withdrawal_message(...) for this
+               amount, nonce and issued_at.
+    admin_signature: admin_wallet's signature over
+                     withdrawal_approval_message(...). The pool value sets
+                     the NAV shares are burned at, so only an admin key
+                     may vouch for it. Raises PermissionError otherwise.
+
+    The audit row is written first as "pending" (which also consumes the
+    nonce), then shares are burned, then it is marked "completed". A crash
+    in between leaves a pending row holding the amount and shares to
+    reconcile, never an unexplained share burn.
+    """
+    if not math.isfinite(amount) or amount <= 0:
+        raise ValueError("Withdrawal amount must be a positive number")
+    if not math.isfinite(total_pool_value) or total_pool_value <= 0:
+        raise ValueError("totalPoolValue must be a positive number")
+    if not nonce or len(nonce) > 128:
+        raise ValueError("nonce must be 1-128 characters")
+
+    age_seconds = time.time() - issued_at / 1000.0
+    if age_seconds > WITHDRAW_AUTH_TTL_SECONDS or age_seconds < -60:
+        raise ValueError("Withdrawal authorization expired")
+
+    approval = withdrawal_approval_message(wallet_address, amount, currency, total_pool_value, nonce)
+    if not is_admin(admin_wallet) or not verify_wallet_signature(admin_wallet, approval, admin_signature):
+        raise PermissionError("Admin approval required")
+
+    message = withdrawal_message(wallet_address, amount, currency, nonce, issued_at)
+    if not verify_wallet_signature(wallet_address, message, signature):
+        raise ValueError("Invalid signature")
+
+    user = users_collection.find_one({"walletAddress": wallet_address})
+    if not user:
+        raise ValueError("User not found")
+
+    pool = get_pool_state()
+    if pool["totalShares"] <= 0:
+        raise ValueError("Pool has no shares to redeem")
+
+    nav = total_pool_value / pool["totalShares"]
+    user_shares = user.get("shares", 0.0)
+    shares_burned = amount / nav
+
+    # Allow a full exit despite float rounding in the client's value display
+    if shares_burned > user_shares:
+        if shares_burned - user_shares > 1e-9 * max(user_shares, 1.0):
+            raise ValueError("Insufficient shares")
+        shares_burned = user_shares
+        amount = shares_burned * nav
+
+    withdrawal = {
+        "userId": wallet_address,
+        "amount": amount,
+        "currency": currency,
+        "txHash": tx_hash,
+        "shares": shares_burned,
+        "nav": nav,
+        "nonce": f"{wallet_address}:{nonce}",
+        "requestedAt": datetime.utcnow(),
+        "timestamp": datetime.utcnow(),
+        "status": "pending"
+    }
+    try:
+        withdrawals_collection.insert_one(withdrawal)
+    except DuplicateKeyError:
+        raise ValueError("Withdrawal authorization already used")
+
+    def fail(reason: str):
+        withdrawals_collection.update_one(
+            {"_id": withdrawal["_id"]},
+            {"$set": {"status": "failed", "error": reason}}
+        )
+        raise ValueError(reason)
+
+    # Burn user shares only if they still hold enough (guards concurrent redemptions)
+    updated_user = users_collection.find_one_and_update(
+        {"walletAddress": wallet_address, "shares": {"$gte": shares_burned}},
+        {"$inc": {"shares": -shares_burned, "totalWithdrawn": amount}},
+        return_document=ReturnDocument.AFTER
+    )
+    if not updated_user:
+        fail("Insufficient shares")
+
+    updated_pool = pool_state_collection.find_one_and_update(
+        {"_id": "pool", "totalShares": {"$gte": shares_burned}},
+        {"$inc": {"totalShares": -shares_burned}},
+        return_document=ReturnDocument.AFTER
+    )
+    if not updated_pool:
+        # Pool share count is out of sync with the user - undo the user burn
+        users_collection.update_one(
+            {"walletAddress": wallet_address},
+            {"$inc": {"shares": shares_burned, "totalWithdrawn": -amount}}
+        )
+        fail("Pool share state inconsistent")
+
+    # Ledger order is by completion time, so exports resumed from a
+    # checkpoint taken while this row was pending still pick it up
+    withdrawals_collection.update_one(
+        {"_id": withdrawal["_id"]},
+        {"$set": {"status": "completed", "timestamp": datetime.utcnow()}}
+    )
+
+    # Recalculate all user allocations from shares
+    _recalculate_allocations()
+
+    return {
+        "success": True,
+        "amount": amount,
+        "shares": shares_burned,
+        "nav": nav,
+        "totalShares": updated_pool["totalShares"],
+        "newTotalWithdrawn": updated_user.get("totalWithdrawn", 0.0),
+        "userShares": updated_user.get("shares", 0.0)
+    }
+
+
 def _recalculate_allocations():
     """
     Recalculate allocation % for all users based on their shares.
@@ -377,12 +720,63 @@ def record_trade(coin: str, trade_type: str, amount: float, price: float, user_a
     }
 
 
+# Page size cap for get_active_users_page
+MAX_USERS_PAGE = 5000
+
+
 def get_all_active_users() -> List[Dict]:
     """Get all active users with their allocations"""
-    users = users_collection.find({"isActive": True})
+    users = _read(users_collection, "get_all_active_users").find({"isActive": True})
     return [format_user_data(user) for user in users]
 
 
+def get_active_users_page(limit: int, after: str = None, fields: List[str] = None,
+                          columnar: bool = False) -> Dict:
+    """
+    One page of active users ordered by walletAddress (walks the unique index).
+    after: walletAddress cursor from the previous page's nextCursor
+    fields: subset of USER_FIELDS to return (default all)
+    columnar: return {"columns": {field: [values...]}} instead of row objects
+    """
+    fields = fields or list(USER_FIELDS)
+    unknown = [f for f in fields if f not in USER_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    limit = int(limit)
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    limit = min(limit, MAX_USERS_PAGE)
+
+    query = {"isActive": True}
+    if after:
+        query["walletAddress"] = {"$gt": after}
+
+    # role is derived from walletAddress, so only fetch the stored fields needed
+    projection = {"_id": 0, "walletAddress": 1}
+    for f in fields:
+        if f not in ("walletAddress", "role"):
+            projection[f] = 1
+
+    users = list(
+        _read(users_collection, "get_all_active_users")
+        .find(query, projection)
+        .sort("walletAddress", 1)
+        .limit(limit)
+    )
+    next_cursor = users[-1]["walletAddress"] if len(users) == limit else None
+
+    if columnar:
+        getters = [(f, USER_FIELDS[f]) for f in fields]
+        columns = {f: [get(u) for u in users] for f, get in getters}
+        return {"columns": columns, "count": len(users), "nextCursor": next_cursor}
+
+    return {
+        "users": [format_user_data(u, fields) for u in users],
+        "count": len(users),
+        "nextCursor": next_cursor
+    }
+
+
 def get_leaderboard(total_pool_value: float) -> List[Dict]:
     """
     Get leaderboard of all non-admin users ranked by current holdings value.
@@ -394,7 +788,7 @@ def get_leaderboard(total_pool_value: float) -> List[Dict]:
     nav = total_pool_value / total_shares if total_shares > 0 else 1.0
 
     # Get all active non-admin users with shares
-    users = list(users_collection.find({
+    users = list(_read(users_collection, "get_leaderboard").find({
         "isActive": True,
         "walletAddress": {"$nin": ADMIN_WALLETS}
     }))
@@ -407,7 +801,7 @@ def get_leaderboard(total_pool_value: float) -> List[Dict]:
         allocation = (user_shares / total_shares * 100) if total_shares > 0 else 0
 
         # Get last deposit for this user
-        last_deposit = deposits_collection.find_one(
+        last_deposit = _read(deposits_collection, "get_leaderboard").find_one(
             {"userId": wallet},
             sort=[("timestamp", -1)]
         )
@@ -443,7 +837,7 @@ def get_admin_stats(total_pool_value: float) -> Dict:
     nav = total_pool_value / total_shares if total_shares > 0 else 1.0
 
     # Active non-admin users
-    users = list(users_collection.find({
+    users = list(_read(users_collection, "get_admin_stats").find({
         "isActive": True,
         "walletAddress": {"$nin": ADMIN_WALLETS}
     }))
@@ -456,28 +850,28 @@ def get_admin_stats(total_pool_value: float) -> Dict:
     total_user_value = sum(u.get("shares", 0) * nav for u in users)
 
     # Last deposit (any user)
-    last_dep = deposits_collection.find_one(
+    last_dep = _read(deposits_collection, "get_admin_stats").find_one(
         {"userId": {"$nin": ADMIN_WALLETS}},
         sort=[("timestamp", -1)]
     )
 
     # Last user registration
-    last_user = users_collection.find_one(
+    last_user = _read(users_collection, "get_admin_stats").find_one(
         {"walletAddress": {"$nin": ADMIN_WALLETS}},
         sort=[("joinedDate", -1)]
     )
 
     # Trade count
-    trade_count = trades_collection.count_documents({})
+    trade_count = _read(trades_collection, "get_admin_stats").count_documents({})
 
     # Deposit count (non-admin)
-    deposit_count = deposits_collection.count_documents(
+    deposit_count = _read(deposits_collection, "get_admin_stats").count_documents(
         {"userId": {"$nin": ADMIN_WALLETS}}
     )
 
     # Withdrawal count (non-admin)
-    withdrawal_count = withdrawals_collection.count_documents(
-        {"userId": {"$nin": ADMIN_WALLETS}}
+    withdrawal_count = _read(withdrawals_collection, "get_admin_stats").count_documents(
+        {"userId": {"$nin": ADMIN_WALLETS}, **COMPLETED_WITHDRAWALS}
     )
 
     return {
@@ -507,7 +901,7 @@ def get_all_transactions(wallet_address: str = None, is_admin_request: bool = Fa
 
     if is_admin_request:
         # Get ALL deposits from all users
-        for dep in deposits_collection.find({}).sort("timestamp", -1):
+        for dep in _read(deposits_collection, "get_all_transactions_admin").find({}).sort("timestamp", -1):
             user_wallet = dep.get("userId", "")
             transactions.append({
                 "type": "deposit",
@@ -519,11 +913,11 @@ def get_all_transactions(wallet_address: str = None, is_admin_request: bool = Fa
                 "timestamp": dep["timestamp"].isoformat() if dep.get("timestamp") else None,
                 "shares": dep.get("shares", 0),
                 "nav": dep.get("nav", 0),
-                "isAdmin": user_wallet in ADMIN_WALLETS
+                "isAdmin": user_wallet in ADMIN_WALLET_SET
             })
 
         # Get ALL trades
-        for trade in trades_collection.find({}).sort("timestamp", -1):
+        for trade in _read(trades_collection, "get_all_transactions_admin").find({}).sort("timestamp", -1):
             transactions.append({
                 "type": "buy" if trade.get("type") == "buy" else "sell",
                 "coin": trade.get("coin", ""),
@@ -535,7 +929,7 @@ def get_all_transactions(wallet_address: str = None, is_admin_request: bool = Fa
             })
 
         # Get ALL withdrawals
-        for wd in withdrawals_collection.find({}).sort("timestamp", -1):
+        for wd in _read(withdrawals_collection, "get_all_transactions_admin").find(COMPLETED_WITHDRAWALS).sort("timestamp", -1):
             user_wallet = wd.get("userId", "")
             transactions.append({
                 "type": "withdrawal",
@@ -543,8 +937,11 @@ def get_all_transactions(wallet_address: str = None, is_admin_request: bool = Fa
                 "walletShort": user_wallet[:4] + "..." + user_wallet[-4:] if len(user_wallet) > 8 else user_wallet,
                 "amount": wd.get("amount", 0),
                 "currency": wd.get("currency", "USDC"),
+                "txHash": wd.get("txHash") or "",
                 "timestamp": wd["timestamp"].isoformat() if wd.get("timestamp") else None,
-                "isAdmin": user_wallet in ADMIN_WALLETS
+                "shares": wd.get("shares", 0),
+                "nav": wd.get("nav", 0),
+                "isAdmin": user_wallet in ADMIN_WALLET_SET
             })
 
         # Sort all by timestamp descending
@@ -566,12 +963,15 @@ def get_all_transactions(wallet_address: str = None, is_admin_request: bool = Fa
                 "nav": dep.get("nav", 0)
             })
 
-        for wd in withdrawals_collection.find({"userId": wallet_address}).sort("timestamp", -1):
+        for wd in withdrawals_collection.find({"userId": wallet_address, **COMPLETED_WITHDRAWALS}).sort("timestamp", -1):
             transactions.append({
                 "type": "withdrawal",
                 "amount": wd.get("amount", 0),
                 "currency": wd.get("currency", "USDC"),
-                "timestamp": wd["timestamp"].isoformat() if wd.get("timestamp") else None
+                "txHash": wd.get("txHash") or "",
+                "timestamp": wd["timestamp"].isoformat() if wd.get("timestamp") else None,
+                "shares": wd.get("shares", 0),
+                "nav": wd.get("nav", 0)
             })
 
         transactions.sort(key=lambda x: x.get("timestamp") or "", reverse=True)
@@ -579,6 +979,193 @@ def get_all_transactions(wallet_address: str = None, is_admin_request: bool = Fa
     return transactions
 
 
+# ── Ledger Export ────────────────────────────────────────────────────────────
+# Streams deposits, trades and withdrawals merged in (timestamp, type, _id)
+# order. Each collection is read with a server-side cursor in batches, so
+# memory stays constant regardless of ledger size. Every row carries a
+# checkpoint token; passing it back as `after` resumes right after that row.
+
+LEDGER_SOURCES = [
+    # (type, collection name) - list order is the tiebreak for equal timestamps
+    ("deposit", "deposits"),
+    ("trade", "trades"),
+    ("withdrawal", "withdrawals"),
+]
+
+LEDGER_FIELDS = [
+    "type", "timestamp", "wallet", "coin", "side", "amount", "currency",
+    "price", "shares", "nav", "allocation", "txHash", "id", "checkpoint"
+]
+
+LEDGER_PROJECTION = [
+    "timestamp", "userId", "coin", "type", "amount", "currency",
+    "price", "shares", "nav", "txHash"
+]
+
+LEDGER_BATCH_SIZE = 1000
+
+
+def encode_ledger_checkpoint(timestamp: datetime, rank: int, doc_id) -> str:
+    """Opaque, URL-safe resume token for a ledger row"""
+    raw = json.dumps([timestamp.isoformat(), rank, str(doc_id)])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_ledger_checkpoint(token: str):
+    """Inverse of encode_ledger_checkpoint. Raises ValueError on bad tokens."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        ts, rank, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(ts), int(rank), ObjectId(doc_id)
+    except Exception:
+        raise ValueError("Invalid checkpoint token")
+
+
+def _ledger_query(rank: int, start: Optional[datetime], end: Optional[datetime],
+                  wallet: Optional[str], after) -> Dict:
+    """Mongo filter for one ledger source, honouring range, wallet and checkpoint"""
+    clauses = []
+    ts_range = {}
+    if start:
+        ts_range["$gte"] = start
+    if end:
+        ts_range["$lt"] = end
+    if ts_range:
+        clauses.append({"timestamp": ts_range})
+
+    if wallet:
+        if LEDGER_SOURCES[rank][0] == "trade":
+            # Pool trades touch every wallet that held an allocation at the time
+            clauses.append({f"userAllocations.{wallet}": {"$exists": True}})
+        else:
+            clauses.append({"userId": wallet})
+
+    if LEDGER_SOURCES[rank][0] == "withdrawal":
+        clauses.append(COMPLETED_WITHDRAWALS)
+
+    if after:
+        after_ts, after_rank, after_id = after
+        if rank < after_rank:
+            clauses.append({"timestamp": {"$gt": after_ts}})
+        elif rank == after_rank:
+            clauses.append({"$or": [
+                {"timestamp": {"$gt": after_ts}},
+                {"timestamp": after_ts, "_id": {"$gt": after_id}}
+            ]})
+        else:
+            clauses.append({"timestamp": {"$gte": after_ts}})
+
+    if not clauses:
+        return {}
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def _ledger_row(kind: str, rank: int, doc: Dict, wallet: Optional[str]) -> Dict:
+    """Flatten a deposit/trade/withdrawal document into one export row"""
+    ts = doc.get("timestamp")
+    row = {
+        "type": kind,
+        "timestamp": ts.isoformat() if ts else None,
+        "wallet": doc.get("userId", "pool"),
+        "coin": doc.get("coin"),
+        "side": doc.get("type") if kind == "trade" else None,
+        "amount": doc.get("amount", 0),
+        "currency": doc.get("currency"),
+        "price": doc.get("price"),
+        "shares": doc.get("shares"),
+        "nav": doc.get("nav"),
+        "allocation": None,
+        "txHash": doc.get("txHash"),
+        "id": str(doc["_id"]),
+        "checkpoint": encode_ledger_checkpoint(ts or datetime.min, rank, doc["_id"])
+    }
+    if kind == "trade" and wallet:
+        row["allocation"] = doc.get("userAllocations", {}).get(wallet)
+    return row
+
+
+def parse_ledger_time(value: Optional[str]) -> Optional[datetime]:
+    """ISO 8601 date/time -> naive UTC datetime for iter_ledger (None passes through)"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo:
+        parsed = (parsed - parsed.utcoffset()).replace(tzinfo=None)
+    return parsed
+
+
+def iter_ledger(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                wallet: Optional[str] = None, after: Optional[str] = None,
+                batch_size: int = LEDGER_BATCH_SIZE) -> Iterator[Dict]:
+    """
+    Yield ledger rows oldest first across deposits, trades and withdrawals.
+    start/end: half-open UTC timestamp range [start, end)
+    wallet: only rows for this wallet (trades it held an allocation in)
+    after: checkpoint token from a previous export to resume from
+    """
+    after_key = decode_ledger_checkpoint(after) if after else None
+
+    # Never pull whole userAllocations maps - they hold every wallet in the pool
+    projection = {f: 1 for f in LEDGER_PROJECTION}
+    if wallet:
+        projection[f"userAllocations.{wallet}"] = 1
+
+    def source(rank, kind, collection):
+        cursor = collection.find(
+            _ledger_query(rank, start, end, wallet, after_key), projection
+        ).sort([("timestamp", 1), ("_id", 1)]).batch_size(batch_size)
+        for doc in cursor:
+            yield (doc.get("timestamp") or datetime.min, rank, doc["_id"]), kind, doc
+
+    streams = [source(rank, kind, storage.collection(name))
+               for rank, (kind, name) in enumerate(LEDGER_SOURCES)]
+    for (_, rank, _), kind, doc in heapq.merge(*streams, key=lambda item: item[0]):
+        yield _ledger_row(kind, rank, doc, wallet)
+
+
+def ledger_trailer(rows: int, fmt: str = "ndjson") -> str:
+    """
+    Final line of a complete export. NDJSON: {"type": "end", "rows": N};
+    CSV: a row with type "end" and "rows=N" in the id column. A stream that
+    stops without it was cut short, whatever the HTTP status said.
+    """
+    if fmt == "ndjson":
+        return json.dumps({"type": "end", "rows": rows}) + "\n"
+    buf = io.StringIO()
+    csv.DictWriter(buf, fieldnames=LEDGER_FIELDS).writerow({"type": "end", "id": f"rows={rows}"})
+    return buf.getvalue()
+
+
+def iter_ledger_lines(rows: Iterator[Dict], fmt: str = "ndjson", header: bool = True,
+                      rows_before: int = 0) -> Iterator[str]:
+    """
+    Serialize ledger rows as NDJSON lines or CSV lines (header optional),
+    ending with ledger_trailer(). rows_before: rows already written by an
+    earlier, resumed run, so the trailer counts the whole file.
+    """
+    count = rows_before
+    if fmt == "ndjson":
+        for row in rows:
+            count += 1
+            yield json.dumps(row) + "\n"
+    elif fmt == "csv":
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=LEDGER_FIELDS)
+        if header:
+            writer.writeheader()
+        for row in rows:
+            count += 1
+            writer.writerow(row)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+        if buf.getvalue():
+            yield buf.getvalue()
+    else:
+        raise ValueError("format must be ndjson or csv")
+    yield ledger_trailer(count, fmt)
+
+
 # ── Persistent Trader State ──────────────────────────────────────────────────
 # Stores auto-trader config, cooldowns, trade log, and pending orders
 # so they sync across devices (iPad / iPhone / desktop).
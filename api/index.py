@@ -3,19 +3,36 @@
 # ==========================================
 from http.server import BaseHTTPRequestHandler
 import json
+import logging
 import os
 import sys
+import time
+from urllib.parse import unquote
 
 # Add parent directory for imports
 sys.path.insert(0, os.path.dirname(__file__))
 
+# Function logs are whatever reaches stderr. Without a handler Python drops
+# everything below WARNING, including signature failures and saved-profile
+# notices, so give the "flub.*" loggers their own handler and level.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+_flub_logger = logging.getLogger("flub")
+if not _flub_logger.handlers:
+    _log_handler = logging.StreamHandler()
+    _log_handler.setFormatter(logging.Formatter("%(levelname)s %(name)s: %(message)s"))
+    _flub_logger.addHandler(_log_handler)
+_flub_logger.setLevel(LOG_LEVEL)
+_flub_logger.propagate = False
+
 from database import (
     register_user,
     get_user_portfolio,
     get_user_deposits,
     record_deposit,
+    record_withdrawal,
     record_trade,
     get_all_active_users,
+    get_active_users_page,
     calculate_pool_allocations,
     is_admin,
     get_trader_state,
@@ -23,10 +40,19 @@ from database import (
     get_pool_state,
     initialize_pool,
     get_user_position,
+    get_user_positions,
     get_leaderboard,
     get_all_transactions,
-    get_admin_stats
+    get_admin_stats,
+    iter_ledger,
+    iter_ledger_lines,
+    parse_ledger_time
 )
+from metrics import begin_request, current_request, end_request, route_metrics
+from profiler import PROFILE_SAMPLE_RATE, SamplingProfiler, sampled
+import traffic
+
+logger = logging.getLogger("flub.api")
 
 
 class handler(BaseHTTPRequestHandler):
@@ -34,10 +60,63 @@ class handler(BaseHTTPRequestHandler):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-Profile')
         self.end_headers()
 
     def do_GET(self):
+        self._dispatch('GET', self._handle_get)
+
+    def do_POST(self):
+        self._dispatch('POST', self._handle_post)
+
+    def _dispatch(self, method, handle):
+        """
+        Run a request handler with its Mongo commands attributed to the route,
+        under the sampling profiler when requested or sampled.
+        """
+        path = self.path.split('?')[0]
+        self._unmatched = False
+        self._status = None
+        self._body = None
+        started = time.time()
+        begin_request(f"{method} {path}")
+
+        profiler, trigger = None, None
+        if 'X-Profile' in self.headers or 'profile=' in self.path or PROFILE_SAMPLE_RATE > 0:
+            trigger = self._profile_trigger()
+            if trigger:
+                profiler = SamplingProfiler()
+                profiler.start()
+
+        try:
+            handle()
+        finally:
+            # Don't let arbitrary unknown paths grow the per-route table
+            stats = end_request(f"{method} (unmatched)" if self._unmatched else None)
+            if traffic.enabled():
+                traffic.record(method, self.path, self._body, self._status,
+                               stats.elapsed_ms() if stats else 0.0, started)
+            if profiler:
+                profiler.stop()
+                self._save_profile(profiler, method, path, trigger)
+
+    def _profile_trigger(self):
+        """'admin' if an admin wallet asked for a profile, 'sampled', or None"""
+        flag = self.headers.get('X-Profile') or self._parse_query_params().get('profile')
+        if flag and is_admin(flag):
+            return 'admin'
+        return 'sampled' if sampled() else None
+
+    def _save_profile(self, profiler, method, path, trigger):
+        params = {k: v for k, v in self._parse_query_params().items() if k != 'profile'}
+        try:
+            # POST inputs live in the JSON body, not the query string
+            profile_id = profiler.save(method, path, params, trigger, body=self._body)
+            logger.info("Saved %s profile %s (%d samples)", trigger, profile_id, profiler.samples)
+        except OSError as e:
+            logger.warning("Could not save profile for %s: %s", path, e)
+
+    def _handle_get(self):
         try:
             path = self.path.split('?')[0]
             params = self._parse_query_params()
@@ -83,8 +162,30 @@ class handler(BaseHTTPRequestHandler):
                 if not wallet or not is_admin(wallet):
                     self._send_json(403, {"error": "Admin access required"})
                     return
-                users = get_all_active_users()
-                self._send_json(200, {"users": users, "count": len(users)})
+
+                # Without limit/fields/format keep the original full listing
+                if not any(k in params for k in ('limit', 'after', 'fields', 'format')):
+                    users = get_all_active_users()
+                    self._send_json(200, {"users": users, "count": len(users)})
+                    return
+
+                fmt = params.get('format', 'rows')
+                if fmt not in ('rows', 'columnar'):
+                    self._send_json(400, {"error": "format must be rows or columnar"})
+                    return
+                try:
+                    limit = int(params.get('limit', 1000))
+                except ValueError:
+                    self._send_json(400, {"error": "limit must be an integer"})
+                    return
+                fields = [f for f in params.get('fields', '').split(',') if f] or None
+                page = get_active_users_page(
+                    limit,
+                    after=params.get('after'),
+                    fields=fields,
+                    columnar=(fmt == 'columnar')
+                )
+                self._send_json(200, page)
 
             elif path == '/api/state':
                 wallet = params.get('admin_wallet')
@@ -114,6 +215,38 @@ class handler(BaseHTTPRequestHandler):
                 stats = get_admin_stats(float(pool_value))
                 self._send_json(200, stats)
 
+            elif path == '/api/admin/metrics':
+                wallet = params.get('wallet')
+                if not wallet or not is_admin(wallet):
+                    self._send_json(403, {"error": "Admin access required"})
+                    return
+                snapshot = route_metrics.snapshot()
+                if params.get('reset') == '1':
+                    route_metrics.reset()
+                self._send_json(200, snapshot)
+
+            elif path == '/api/admin/export':
+                wallet = params.get('wallet')
+                if not wallet or not is_admin(wallet):
+                    self._send_json(403, {"error": "Admin access required"})
+                    return
+                fmt = params.get('format', 'ndjson')
+                if fmt not in ('ndjson', 'csv'):
+                    self._send_json(400, {"error": "format must be ndjson or csv"})
+                    return
+                try:
+                    start = parse_ledger_time(params.get('from'))
+                    end = parse_ledger_time(params.get('to'))
+                except ValueError:
+                    self._send_json(400, {"error": "from/to must be ISO 8601 timestamps"})
+                    return
+
+                # Lazy: a bad checkpoint token raises on the first chunk,
+                # before _send_stream has written any headers
+                rows = iter_ledger(start, end, params.get('filterWallet'), params.get('after'))
+                content_type = 'application/x-ndjson' if fmt == 'ndjson' else 'text/csv'
+                self._send_stream(200, content_type, iter_ledger_lines(rows, fmt))
+
             elif path == '/api/leaderboard':
                 pool_value = params.get('poolValue')
                 if not pool_value:
@@ -135,12 +268,15 @@ class handler(BaseHTTPRequestHandler):
                 self._send_json(200, {"transactions": txns, "count": len(txns), "isAdmin": admin_req})
 
             else:
+                self._unmatched = True
                 self._send_json(404, {"error": "Not found"})
 
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
         except Exception as e:
             self._send_json(500, {"error": str(e)})
 
-    def do_POST(self):
+    def _handle_post(self):
         try:
             path = self.path.split('?')[0]
             body = self._read_body()
@@ -174,6 +310,55 @@ class handler(BaseHTTPRequestHandler):
                 )
                 self._send_json(200, result)
 
+            elif path == '/api/withdraw':
+                # Admin submits the user's signed authorization with the
+                # pool valuation, and signs that valuation itself: admin
+                # addresses are public, so adminWallet alone proves nothing
+                admin_wallet = body.get('adminWallet')
+                admin_signature = body.get('adminSignature')
+                if not admin_wallet or not is_admin(admin_wallet) or not admin_signature:
+                    self._send_json(403, {"error": "Admin access required"})
+                    return
+
+                wallet_address = body.get('walletAddress')
+                amount = body.get('amount')
+                pool_value = body.get('totalPoolValue')
+                signature = body.get('signature')
+                nonce = body.get('nonce')
+                issued_at = body.get('issuedAt')
+                currency = body.get('currency', 'USDC')
+                tx_hash = body.get('txHash')
+
+                if not all([wallet_address, amount, pool_value, signature, nonce, issued_at]):
+                    self._send_json(400, {"error": "walletAddress, amount, totalPoolValue, signature, nonce, and issuedAt required"})
+                    return
+
+                result = record_withdrawal(
+                    wallet_address, float(amount), float(pool_value),
+                    signature, str(nonce), int(issued_at),
+                    admin_wallet, admin_signature, currency, tx_hash
+                )
+                self._send_json(200, result)
+
+            elif path == '/api/users/positions':
+                admin_wallet = body.get('adminWallet')
+                if not admin_wallet or not is_admin(admin_wallet):
+                    self._send_json(403, {"error": "Admin access required"})
+                    return
+
+                wallets = body.get('wallets')
+                pool_value = body.get('poolValue')
+
+                if not isinstance(wallets, list) or not pool_value:
+                    self._send_json(400, {"error": "wallets (list) and poolValue required"})
+                    return
+                if not all(isinstance(w, str) for w in wallets):
+                    self._send_json(400, {"error": "wallets must be strings"})
+                    return
+
+                positions = get_user_positions(wallets, float(pool_value))
+                self._send_json(200, {"positions": positions, "count": len(positions)})
+
             elif path == '/api/pool/initialize':
                 admin_wallet = body.get('adminWallet')
                 pool_value = body.get('totalPoolValue')
@@ -195,7 +380,7 @@ class handler(BaseHTTPRequestHandler):
                     return
 
                 # Accept partial updates — only overwrite keys that are sent
-                allowed_keys = {'pendingOrders', 'autoTiers', 'autoCooldowns', 'autoTradeLog', 'autoActive'}
+                allowed_keys = {'pendingOrders', 'autoTiers', 'autoTierAssignments', 'autoCooldowns', 'autoTradeLog', 'autoActive'}
                 update = {k: v for k, v in body.items() if k in allowed_keys}
 
                 if not update:
@@ -205,6 +390,35 @@ class handler(BaseHTTPRequestHandler):
                 result = save_trader_state(update)
                 self._send_json(200, result)
 
+            elif path == '/api/admin/autotrader/evaluate':
+                admin_wallet = body.get('adminWallet')
+                if not admin_wallet or not is_admin(admin_wallet):
+                    self._send_json(403, {"error": "Admin access required"})
+                    return
+
+                prices = body.get('prices')
+                usdc_balance = body.get('usdcBalance')
+                if not isinstance(prices, dict) or usdc_balance is None:
+                    self._send_json(400, {"error": "prices (object) and usdcBalance required"})
+                    return
+
+                # Imported here: NumPy would otherwise load on every cold start
+                from autotrader import evaluate_snapshot
+
+                state = get_trader_state()
+                # Optional override, e.g. to try assignments before saving them
+                if isinstance(body.get('tierAssignments'), dict):
+                    state['autoTierAssignments'] = body['tierAssignments']
+
+                result = evaluate_snapshot(
+                    state,
+                    {k: float(v) for k, v in prices.items() if v is not None},
+                    float(usdc_balance),
+                    {k: float(v) for k, v in (body.get('balances') or {}).items() if v is not None},
+                    float(body.get('now') or time.time() * 1000)
+                )
+                self._send_json(200, result)
+
             elif path == '/api/trade':
                 admin_wallet = body.get('adminWallet')
                 if not admin_wallet or not is_admin(admin_wallet):
@@ -231,8 +445,11 @@ class handler(BaseHTTPRequestHandler):
                 self._send_json(200, result)
 
             else:
+                self._unmatched = True
                 self._send_json(404, {"error": "Not found"})
 
+        except PermissionError as e:
+            self._send_json(403, {"error": str(e)})
         except ValueError as e:
             self._send_json(400, {"error": str(e)})
         except Exception as e:
@@ -241,18 +458,62 @@ class handler(BaseHTTPRequestHandler):
     # ── Helpers ──────────────────────────────────────────────────────────────
 
     def _send_json(self, status_code, data):
+        # Serialize first: a failure after send_response() would put a
+        # second (500) response on the wire behind the first
+        payload = json.dumps(data).encode('utf-8')
+        self._status = status_code
         self.send_response(status_code)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         self.send_header('Content-Type', 'application/json')
+        self._send_timing_header()
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode('utf-8'))
+        self.wfile.write(payload)
+
+    def _send_stream(self, status_code, content_type, chunks):
+        """
+        Stream an iterator of str chunks without buffering the whole body.
+        Headers are sent only once the first chunk is ready, so errors raised
+        before that still become a normal JSON error response. Once streaming
+        has started an error can only end the response early: the stream then
+        lacks its end trailer (see ledger_trailer), which is how clients
+        tell a cut-off export from a complete one before resuming from the
+        last checkpoint they received.
+        """
+        chunks = iter(chunks)
+        first = next(chunks, "")
+
+        self._status = status_code
+        self.send_response(status_code)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Content-Type', content_type)
+        self.send_header('Connection', 'close')
+        # Covers work done up to the first chunk only
+        self._send_timing_header()
+        self.end_headers()
+        self.close_connection = True
+
+        try:
+            if first:
+                self.wfile.write(first.encode('utf-8'))
+            for chunk in chunks:
+                self.wfile.write(chunk.encode('utf-8'))
+        except Exception as e:
+            logger.warning("Stream aborted on %s: %s", self.path.split('?')[0], e)
+
+    def _send_timing_header(self):
+        stats = current_request()
+        if stats:
+            self.send_header('Server-Timing', stats.server_timing())
 
     def _read_body(self):
         content_length = int(self.headers.get('Content-Length', 0))
         body = self.rfile.read(content_length)
-        return json.loads(body) if body else {}
+        self._body = json.loads(body) if body else {}
+        return self._body
 
     def _parse_query_params(self):
         params = {}
@@ -261,5 +522,5 @@ class handler(BaseHTTPRequestHandler):
             for param in query_string.split('&'):
                 if '=' in param:
                     key, value = param.split('=', 1)
-                    params[key] = value
+                    params[key] = unquote(value)
         return params
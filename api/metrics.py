@@ -0,0 +1,168 @@
+# ==========================================
+# Request Metrics - Mongo Command Timing
+# ==========================================
+# A pymongo CommandListener attributes every Mongo command to the HTTP
+# request running on the same thread (pymongo publishes events on the
+# calling thread). Per request we keep: command count, total DB time and
+# the slowest command. The handler turns that into a Server-Timing header
+# and feeds a rolling window of samples per route for /api/admin/metrics.
+#
+# Windows are per process: on serverless each warm instance reports its own.
+# ==========================================
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from pymongo import monitoring
+
+logger = logging.getLogger("flub.metrics")
+
+# Samples kept per route for percentile calculation
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "1000"))
+
+# Commands slower than this are logged individually
+SLOW_COMMAND_MS = float(os.getenv("SLOW_COMMAND_MS", "100"))
+
+
+class RequestStats:
+    """Mongo activity and wall time for one in-flight request"""
+
+    def __init__(self, route: str):
+        self.route = route
+        self.started = time.perf_counter()
+        self.commands = 0
+        self.db_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_command = None
+
+    def add(self, command_name: str, duration_ms: float):
+        self.commands += 1
+        self.db_ms += duration_ms
+        if duration_ms > self.slowest_ms:
+            self.slowest_ms = duration_ms
+            self.slowest_command = command_name
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000.0
+
+    def server_timing(self) -> str:
+        """Server-Timing header value (https://w3c.github.io/server-timing/)"""
+        parts = [
+            f'db;dur={self.db_ms:.2f};desc="{self.commands} cmds"',
+            f"app;dur={self.elapsed_ms():.2f}",
+        ]
+        if self.slowest_command:
+            parts.append(f'db-slowest;dur={self.slowest_ms:.2f};desc="{self.slowest_command}"')
+        return ", ".join(parts)
+
+
+_current = threading.local()
+
+
+def begin_request(route: str) -> RequestStats:
+    """Start attributing Mongo commands on this thread to a new request"""
+    stats = RequestStats(route)
+    _current.stats = stats
+    return stats
+
+
+def current_request() -> Optional[RequestStats]:
+    return getattr(_current, "stats", None)
+
+
+def end_request(route: Optional[str] = None) -> Optional[RequestStats]:
+    """Stop attribution and add the request to its route's rolling window"""
+    stats = current_request()
+    _current.stats = None
+    if stats is None:
+        return None
+    route_metrics.record(route or stats.route, stats)
+    return stats
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Feeds command durations into the current thread's RequestStats"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event, failed=False)
+
+    def failed(self, event):
+        self._record(event, failed=True)
+
+    def _record(self, event, failed: bool):
+        duration_ms = event.duration_micros / 1000.0
+        stats = current_request()
+        if stats is not None:
+            stats.add(event.command_name, duration_ms)
+        if duration_ms >= SLOW_COMMAND_MS or failed:
+            logger.warning(
+                "mongo %s %s %.1fms%s",
+                event.command_name, event.database_name, duration_ms,
+                " FAILED" if failed else ""
+            )
+
+
+def percentiles(values) -> Dict:
+    """Nearest-rank p50/p90/p99/max of values (any iterable), rounded to 3 dp"""
+    ordered = sorted(values)
+    if not ordered:
+        return {"p50": 0, "p90": 0, "p99": 0, "max": 0}
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))], 3)
+
+    return {"p50": pct(50), "p90": pct(90), "p99": pct(99), "max": round(ordered[-1], 3)}
+
+
+class RouteMetrics:
+    """Rolling per-route windows of (total ms, db ms, commands, slowest)"""
+
+    def __init__(self, window: int = METRICS_WINDOW):
+        self.window = window
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.counts = {}
+
+    def record(self, route: str, stats: RequestStats):
+        sample = (stats.elapsed_ms(), stats.db_ms, stats.commands,
+                  stats.slowest_ms, stats.slowest_command)
+        with self.lock:
+            if route not in self.samples:
+                self.samples[route] = deque(maxlen=self.window)
+                self.counts[route] = 0
+            self.samples[route].append(sample)
+            self.counts[route] += 1
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            samples = {route: list(window) for route, window in self.samples.items()}
+            counts = dict(self.counts)
+
+        routes = {}
+        for route, window in sorted(samples.items()):
+            slowest = max(window, key=lambda s: s[3])
+            routes[route] = {
+                "requests": counts[route],
+                "windowSize": len(window),
+                "totalMs": percentiles(s[0] for s in window),
+                "dbMs": percentiles(s[1] for s in window),
+                "commands": percentiles(s[2] for s in window),
+                "slowestCommand": {"command": slowest[4], "ms": round(slowest[3], 3)},
+            }
+        return {"window": self.window, "routes": routes}
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+            self.counts.clear()
+
+
+command_listener = CommandMetricsListener()
+route_metrics = RouteMetrics()
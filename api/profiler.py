@@ -0,0 +1,135 @@
+# ==========================================
+# On-demand Sampling Profiler
+# ==========================================
+# Samples the stack of the thread serving one request at a fixed interval
+# and writes it in collapsed-stack format (one "root;...;leaf count" line per
+# unique stack), ready for flamegraph.pl, speedscope or inferno. A JSON
+# sidecar records the route, query parameters and timing.
+#
+# Nothing here runs unless the handler decides to profile a request:
+#   - admin-triggered: X-Profile: <admin wallet> header or ?profile=<admin wallet>
+#   - sampled: PROFILE_SAMPLE_RATE (0..1, default 0 = off)
+#
+# Only the newest PROFILE_MAX_FILES profiles are kept in PROFILE_DIR.
+# ==========================================
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/flub-profiles")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+
+# Request body fields never written to a profile sidecar
+REDACTED_FIELDS = {"signature", "adminSignature"}
+
+
+def sampled() -> bool:
+    """Random sampling decision for requests nobody asked to profile"""
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def redact(value):
+    """Copy of a JSON request body without REDACTED_FIELDS (at any depth)"""
+    if isinstance(value, dict):
+        return {k: redact(v) for k, v in value.items() if k not in REDACTED_FIELDS}
+    if isinstance(value, list):
+        return [redact(v) for v in value]
+    return value
+
+
+def prune(directory: str = None, keep: int = None):
+    """Delete all but the newest `keep` profiles (ids sort by time)"""
+    directory = directory or PROFILE_DIR
+    keep = PROFILE_MAX_FILES if keep is None else keep
+    ids = sorted({os.path.splitext(name)[0] for name in os.listdir(directory)
+                  if name.endswith((".json", ".collapsed"))})
+    for profile_id in ids[:max(0, len(ids) - keep)]:
+        for ext in (".json", ".collapsed"):
+            try:
+                os.remove(os.path.join(directory, profile_id + ext))
+            except FileNotFoundError:
+                pass  # another request pruned it first
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Samples one thread's stack from a background thread until stopped"""
+
+    def __init__(self, thread_id: int = None, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval_ms / 1000.0
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self.started_at = None
+        self.duration_ms = 0.0
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="flub-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.duration_ms = (time.perf_counter() - self.started_at) * 1000.0
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None or self.thread_id == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[";".join(stack)] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def save(self, method: str, path: str, params: Dict, trigger: str,
+             directory: str = None, body: Optional[Dict] = None) -> Optional[str]:
+        """
+        Write <id>.collapsed and <id>.json, then prune old profiles;
+        returns the profile id. body: JSON request body (redacted here).
+        """
+        directory = directory or PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        route = path.strip("/").replace("/", "_") or "root"
+        profile_id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{method}-{route}"
+
+        with open(os.path.join(directory, profile_id + ".collapsed"), "w") as f:
+            f.write(self.collapsed())
+        with open(os.path.join(directory, profile_id + ".json"), "w") as f:
+            json.dump({
+                "method": method,
+                "path": path,
+                "params": params,
+                "body": redact(body) if body is not None else None,
+                "trigger": trigger,
+                "durationMs": round(self.duration_ms, 3),
+                "intervalMs": self.interval * 1000.0,
+                "samples": self.samples,
+                "timestamp": datetime.utcnow().isoformat()
+            }, f, indent=2)
+        prune(directory)
+        return profile_id
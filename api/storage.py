@@ -0,0 +1,683 @@
+# ==========================================
+# Storage Backends
+# ==========================================
+# database.py talks to named collections through a Storage object instead
+# of module-level pymongo handles, so the NAV/ledger logic can run on:
+#   - MongoStorage:  the real thing (pymongo)
+#   - MemoryStorage: a fast in-process engine implementing the subset of the
+#     pymongo Collection API that database.py uses, with the same semantics
+#     where it matters: unique indexes raise DuplicateKeyError, $inc/$set on
+#     dotted paths, atomic find_one_and_update, ms-precision datetimes,
+#     copies in/out (callers never share state with the store).
+#     Each operation is reported to event_listeners under the command name
+#     Mongo would use (find, insert, findAndModify...), so request metrics
+#     and bench command counts work on either backend.
+#
+# Select with FLUB_STORAGE=mongo|memory, or swap at runtime with
+# database.use_storage(). A read-through cache can wrap either backend by
+# implementing Storage.collection().
+# ==========================================
+
+import itertools
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import MongoClient, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.results import DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+COLLECTIONS = ["users", "trades", "deposits", "withdrawals", "trader_state", "pool_state"]
+
+# (collection, keys, create_index options) - created by every backend on startup
+INDEXES = [
+    ("users", "walletAddress", {"unique": True}),
+    ("trades", [("userId", 1), ("timestamp", -1)], {}),
+    ("deposits", [("userId", 1), ("timestamp", -1)], {}),
+    ("deposits", "txHash", {"unique": True}),
+    ("withdrawals", [("userId", 1), ("timestamp", -1)], {}),
+    # Each signed withdrawal authorization can be redeemed once; rows from
+    # before authorizations carried a nonce have none and are skipped
+    ("withdrawals", "nonce", {"unique": True, "sparse": True}),
+    # Global history indexes: admin transaction history and admin stats read
+    # every deposit/trade/withdrawal sorted newest first; the _id tiebreak lets
+    # the ledger export walk the same index in a stable, resumable order
+    ("deposits", [("timestamp", -1), ("_id", -1)], {}),
+    ("trades", [("timestamp", -1), ("_id", -1)], {}),
+    ("withdrawals", [("timestamp", -1), ("_id", -1)], {}),
+]
+
+
+class Storage(ABC):
+    """Backend interface: named collections with pymongo Collection methods"""
+
+    name = None
+
+    @abstractmethod
+    def collection(self, name: str):
+        """Collection handle for name (created on first use)"""
+
+    @abstractmethod
+    def drop(self):
+        """Delete every document and secondary index"""
+
+    def ensure_indexes(self):
+        for coll, keys, options in INDEXES:
+            self.collection(coll).create_index(keys, **options)
+
+
+class MongoStorage(Storage):
+    name = "mongo"
+
+    def __init__(self, uri: str, db_name: str, event_listeners: List = None):
+        self.client = MongoClient(uri, event_listeners=event_listeners or [])
+        self.db = self.client[db_name]
+
+    def collection(self, name: str):
+        return self.db[name]
+
+    def drop(self):
+        self.client.drop_database(self.db.name)
+
+
+class MemoryStorage(Storage):
+    name = "memory"
+
+    def __init__(self, event_listeners: List = None):
+        # Shared with every collection; listeners appended later still apply
+        self.event_listeners = list(event_listeners or [])
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def collection(self, name: str):
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = MemoryCollection(name, self.event_listeners)
+            return self._collections[name]
+
+    def drop(self):
+        # Keep the collection objects so existing references stay valid
+        with _command(self.event_listeners, "dropDatabase"):
+            for coll in list(self._collections.values()):
+                coll._clear()
+
+
+# ── In-memory engine ─────────────────────────────────────────────────────────
+
+_MISSING = object()
+
+_request_ids = itertools.count(1)
+
+
+class _CommandEvent:
+    """The pymongo CommandStarted/Succeeded/FailedEvent fields listeners read"""
+
+    database_name = "memory"
+
+    def __init__(self, command_name: str):
+        self.command_name = command_name
+        self.request_id = next(_request_ids)
+        self.duration_micros = 0
+        self.failure = None
+
+
+class _command:
+    """Report one engine operation to pymongo-style command listeners"""
+
+    def __init__(self, listeners: List, command_name: str):
+        self.listeners = listeners
+        self.event = _CommandEvent(command_name) if listeners else None
+
+    def __enter__(self):
+        if self.event is not None:
+            for listener in self.listeners:
+                listener.started(self.event)
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.event is None:
+            return False
+        self.event.duration_micros = int((time.perf_counter() - self.start) * 1e6)
+        if exc is not None:
+            self.event.failure = {"errmsg": str(exc)}
+        for listener in self.listeners:
+            if exc is None:
+                listener.succeeded(self.event)
+            else:
+                listener.failed(self.event)
+        return False
+
+
+def _store_value(value):
+    """Copy a value into the store the way BSON would round-trip it"""
+    if isinstance(value, dict):
+        return {k: _store_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_store_value(v) for v in value]
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    return value
+
+
+def _copy(value):
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+def _get_path(doc, path: str):
+    """Value at a dotted path, or _MISSING"""
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        else:
+            return _MISSING
+    return value
+
+
+def _set_path(doc: Dict, path: str, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        nxt = doc.get(part)
+        if not isinstance(nxt, dict):
+            nxt = {}
+            doc[part] = nxt
+        doc = nxt
+    doc[parts[-1]] = value
+
+
+def _type_rank(value) -> int:
+    """BSON comparison order for the types the app stores"""
+    if value is None or value is _MISSING:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+
+def _sort_key(value):
+    rank = _type_rank(value)
+    if rank == 1:
+        return (rank, 0)
+    if rank in (4, 5):
+        return (rank, str(value))
+    return (rank, value)
+
+
+def _compare(value, op: str, target) -> bool:
+    if value is _MISSING or _type_rank(value) != _type_rank(target):
+        return False
+    if op == "$gt":
+        return value > target
+    if op == "$gte":
+        return value >= target
+    if op == "$lt":
+        return value < target
+    return value <= target
+
+
+def _equals(value, target) -> bool:
+    if value is _MISSING:
+        return target is None
+    if isinstance(value, list) and not isinstance(target, list):
+        return any(_equals(v, target) for v in value)
+    if _type_rank(value) != _type_rank(target):
+        return False
+    return value == target
+
+
+def _in(value, targets) -> bool:
+    if isinstance(value, str):
+        return value in targets  # str only equals str, so a C-level scan is exact
+    return any(_equals(value, t) for t in targets)
+
+
+def _match_condition(value, cond) -> bool:
+    if isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+        for op, target in cond.items():
+            if op == "$eq":
+                ok = _equals(value, target)
+            elif op == "$ne":
+                ok = not _equals(value, target)
+            elif op in ("$gt", "$gte", "$lt", "$lte"):
+                ok = _compare(value, op, target)
+            elif op == "$in":
+                ok = _in(value, target)
+            elif op == "$nin":
+                ok = not _in(value, target)
+            elif op == "$exists":
+                ok = (value is not _MISSING) == bool(target)
+            else:
+                raise ValueError(f"Unsupported query operator {op}")
+            if not ok:
+                return False
+        return True
+    return _equals(value, cond)
+
+
+def _matches(doc: Dict, query: Optional[Dict]) -> bool:
+    if not query:
+        return True
+    for key, cond in query.items():
+        if key == "$or":
+            if not any(_matches(doc, q) for q in cond):
+                return False
+        elif key == "$and":
+            if not all(_matches(doc, q) for q in cond):
+                return False
+        elif not _match_condition(_get_path(doc, key), cond):
+            return False
+    return True
+
+
+def _normalize_keys(keys) -> List[tuple]:
+    if isinstance(keys, str):
+        return [(keys, 1)]
+    return [(k, d) for k, d in keys]
+
+
+def _project(doc: Dict, projection: Optional[Dict]) -> Dict:
+    if not projection:
+        return _copy(doc)
+    include_id = projection.get("_id", 1)
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+    if fields and any(fields.values()):
+        out = {}
+        if include_id and "_id" in doc:
+            out["_id"] = doc["_id"]
+        for path in fields:
+            value = _get_path(doc, path)
+            if value is not _MISSING:
+                _set_path(out, path, _copy(value))
+        return out
+    out = _copy(doc)
+    for path in fields:
+        parts = path.split(".")
+        target = out
+        for part in parts[:-1]:
+            target = target.get(part) if isinstance(target, dict) else None
+        if isinstance(target, dict):
+            target.pop(parts[-1], None)
+    if not include_id:
+        out.pop("_id", None)
+    return out
+
+
+_UNHASHABLE = object()
+
+
+def _hashable(value):
+    """Index bucket key; arrays/subdocuments share one always-scanned bucket"""
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return _UNHASHABLE
+
+
+class _MemoryIndex:
+    """Hash index on the first key field (+ uniqueness over all key fields)"""
+
+    def __init__(self, name: str, keys: List[tuple], unique: bool, sparse: bool = False):
+        self.name = name
+        self.keys = keys
+        self.field = keys[0][0]
+        self.unique = unique
+        self.sparse = sparse
+        self.buckets = {}   # first-field value -> {_id: None} (ordered set)
+        self.unique_map = {}
+
+    def _bucket_key(self, doc):
+        value = _get_path(doc, self.field)
+        return _hashable(None if value is _MISSING else value)
+
+    def _unique_key(self, doc):
+        values = []
+        for field, _ in self.keys:
+            value = _get_path(doc, field)
+            values.append(_hashable(None if value is _MISSING else value))
+        return tuple(values)
+
+    def _skips(self, doc: Dict) -> bool:
+        """Sparse indexes leave out docs that have none of the key fields"""
+        return self.sparse and all(_get_path(doc, f) is _MISSING for f, _ in self.keys)
+
+    def check(self, doc: Dict, ignore_id=None):
+        if not self.unique or self._skips(doc):
+            return
+        existing = self.unique_map.get(self._unique_key(doc))
+        if existing is not None and existing != ignore_id:
+            raise DuplicateKeyError(
+                f"E11000 duplicate key error index: {self.name} dup key: {self._unique_key(doc)}"
+            )
+
+    def add(self, doc: Dict):
+        if self._skips(doc):
+            return
+        self.buckets.setdefault(self._bucket_key(doc), {})[doc["_id"]] = None
+        if self.unique:
+            self.unique_map[self._unique_key(doc)] = doc["_id"]
+
+    def remove(self, doc: Dict):
+        if self._skips(doc):
+            return
+        bucket = self.buckets.get(self._bucket_key(doc))
+        if bucket is not None:
+            bucket.pop(doc["_id"], None)
+            if not bucket:
+                del self.buckets[self._bucket_key(doc)]
+        if self.unique:
+            key = self._unique_key(doc)
+            if self.unique_map.get(key) == doc["_id"]:
+                del self.unique_map[key]
+
+
+class MemoryCursor:
+    """Lazy find() result supporting the chaining database.py uses"""
+
+    def __init__(self, collection, query, projection):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort = None
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list, direction=None):
+        if isinstance(key_or_list, str):
+            self._sort = [(key_or_list, direction or 1)]
+        else:
+            self._sort = list(key_or_list)
+        return self
+
+    def skip(self, n: int):
+        self._skip = n
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def batch_size(self, n: int):
+        return self
+
+    def explain(self) -> Dict:
+        """The executionStats subset of Mongo's explain output"""
+        coll = self._collection
+        with _command(coll._listeners, "explain"), coll._lock:
+            stage, index_name, candidates = coll._plan(self._query)
+            returned = len(coll._select(self._query, self._sort, self._skip, self._limit))
+        plan = {"stage": stage}
+        if index_name:
+            plan["indexName"] = index_name
+        return {
+            "queryPlanner": {"namespace": f"memory.{coll.name}", "winningPlan": plan},
+            "executionStats": {"nReturned": returned, "totalDocsExamined": len(candidates)},
+        }
+
+    def __iter__(self):
+        with _command(self._collection._listeners, "find"):
+            docs = self._collection._select(self._query, self._sort, self._skip, self._limit)
+        return iter([_project(d, self._projection) for d in docs])
+
+
+class MemoryCollection:
+    """Thread-safe in-memory stand-in for a pymongo Collection"""
+
+    def __init__(self, name: str, listeners: List = None):
+        self.name = name
+        self._listeners = listeners if listeners is not None else []
+        self._lock = threading.RLock()
+        self._docs = {}
+        self._indexes = {}
+
+    # ── housekeeping ──
+
+    def with_options(self, **kwargs):
+        # Read preferences are meaningless for a single in-process store
+        return self
+
+    def drop(self):
+        with _command(self._listeners, "drop"):
+            self._clear()
+
+    def _clear(self):
+        with self._lock:
+            self._docs.clear()
+            self._indexes.clear()
+
+    def create_index(self, keys, unique: bool = False, name: str = None,
+                     sparse: bool = False, **kwargs) -> str:
+        keys = _normalize_keys(keys)
+        name = name or "_".join(f"{k}_{d}" for k, d in keys)
+        with _command(self._listeners, "createIndexes"), self._lock:
+            if name in self._indexes:
+                return name
+            index = _MemoryIndex(name, keys, unique, sparse)
+            for doc in self._docs.values():
+                index.check(doc)
+                index.add(doc)
+            self._indexes[name] = index
+        return name
+
+    def drop_indexes(self):
+        with _command(self._listeners, "dropIndexes"), self._lock:
+            self._indexes.clear()
+
+    # ── query planning ──
+
+    def _candidates(self, query: Optional[Dict]):
+        return self._plan(query)[2]
+
+    def _plan(self, query: Optional[Dict]):
+        """
+        (stage, index name, docs that may match): narrowed by _id or a hash
+        index when possible, named like the matching Mongo plan stages
+        """
+        if query:
+            if "_id" in query and not isinstance(query["_id"], dict):
+                doc = self._docs.get(query["_id"])
+                return "IDHACK", None, [doc] if doc is not None else []
+            for index in self._indexes.values():
+                cond = query.get(index.field, _MISSING)
+                if cond is _MISSING or index.sparse:
+                    continue
+                if isinstance(cond, dict) and list(cond) == ["$in"]:
+                    values = cond["$in"]
+                elif not isinstance(cond, (dict, list)):
+                    values = [cond]
+                else:
+                    continue
+                ids = dict(index.buckets.get(_UNHASHABLE, {}))
+                for value in values:
+                    ids.update(index.buckets.get(_hashable(value), {}))
+                return "IXSCAN", index.name, [self._docs[i] for i in ids]
+        return "COLLSCAN", None, list(self._docs.values())
+
+    def _select(self, query, sort=None, skip=0, limit=0) -> List[Dict]:
+        with self._lock:
+            docs = [d for d in self._candidates(query) if _matches(d, query)]
+        if sort:
+            for field, direction in reversed(sort):
+                docs.sort(key=lambda d: _sort_key(_get_path(d, field)), reverse=direction < 0)
+        if skip:
+            docs = docs[skip:]
+        if limit:
+            docs = docs[:limit]
+        return docs
+
+    # ── reads ──
+
+    def find(self, filter: Dict = None, projection: Dict = None, **kwargs) -> MemoryCursor:
+        cursor = MemoryCursor(self, filter, projection)
+        if kwargs.get("sort"):
+            cursor.sort(kwargs["sort"])
+        if kwargs.get("limit"):
+            cursor.limit(kwargs["limit"])
+        return cursor
+
+    def find_one(self, filter: Dict = None, projection: Dict = None, sort=None, **kwargs):
+        with _command(self._listeners, "find"):
+            docs = self._select(filter, _normalize_keys(sort) if sort else None, limit=1)
+        return _project(docs[0], projection) if docs else None
+
+    def count_documents(self, filter: Dict, **kwargs) -> int:
+        # pymongo runs count_documents as an aggregate
+        with _command(self._listeners, "aggregate"), self._lock:
+            return sum(1 for d in self._candidates(filter) if _matches(d, filter))
+
+    # ── writes ──
+
+    def _insert(self, doc: Dict):
+        if "_id" not in doc:
+            doc["_id"] = ObjectId()  # pymongo sets _id on the caller's dict too
+        stored = _store_value(doc)
+        if stored["_id"] in self._docs:
+            raise DuplicateKeyError(f"E11000 duplicate key error index: _id_ dup key: {stored['_id']}")
+        for index in self._indexes.values():
+            index.check(stored)
+        self._docs[stored["_id"]] = stored
+        for index in self._indexes.values():
+            index.add(stored)
+        return stored["_id"]
+
+    def insert_one(self, document: Dict, **kwargs) -> InsertOneResult:
+        with _command(self._listeners, "insert"), self._lock:
+            return InsertOneResult(self._insert(document), True)
+
+    def insert_many(self, documents, ordered: bool = True, **kwargs) -> InsertManyResult:
+        inserted, errors = [], []
+        with _command(self._listeners, "insert"), self._lock:
+            for i, doc in enumerate(documents):
+                try:
+                    inserted.append(self._insert(doc))
+                except DuplicateKeyError as e:
+                    # Bulk inserts report duplicates per document, like pymongo
+                    errors.append({"index": i, "code": 11000, "errmsg": str(e), "op": doc})
+                    if ordered:
+                        break
+            if errors:
+                raise BulkWriteError({
+                    "writeErrors": errors, "writeConcernErrors": [], "nInserted": len(inserted),
+                    "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": [],
+                })
+        return InsertManyResult(inserted, True)
+
+    def _apply_update(self, doc: Dict, update: Dict, inserting: bool = False) -> Dict:
+        """Return an updated copy of doc; the stored doc is untouched"""
+        if not update or not all(k.startswith("$") for k in update):
+            raise ValueError("update only works with $ operators")
+        new = _copy(doc)
+        for op, fields in update.items():
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                for path, value in fields.items():
+                    _set_path(new, path, _store_value(value))
+            elif op == "$inc":
+                for path, amount in fields.items():
+                    current = _get_path(new, path)
+                    if current is _MISSING or current is None:
+                        current = 0
+                    elif not isinstance(current, (int, float)) or isinstance(current, bool):
+                        raise ValueError(f"Cannot apply $inc to non-numeric field {path}")
+                    _set_path(new, path, current + amount)
+            elif op == "$unset":
+                for path in fields:
+                    parts = path.split(".")
+                    target = _get_path(new, ".".join(parts[:-1])) if len(parts) > 1 else new
+                    if isinstance(target, dict):
+                        target.pop(parts[-1], None)
+            elif op != "$setOnInsert":
+                raise ValueError(f"Unsupported update operator {op}")
+        if new.get("_id") != doc.get("_id"):
+            raise ValueError("Performing an update on the path '_id' would modify the immutable field '_id'")
+        return new
+
+    def _replace(self, old: Dict, new: Dict):
+        for index in self._indexes.values():
+            index.check(new, ignore_id=old["_id"])
+        for index in self._indexes.values():
+            index.remove(old)
+        self._docs[new["_id"]] = new
+        for index in self._indexes.values():
+            index.add(new)
+
+    def _upsert_doc(self, filter: Dict, update: Dict) -> Dict:
+        seed = {}
+        for key, cond in (filter or {}).items():
+            if not key.startswith("$") and not (isinstance(cond, dict) and any(k.startswith("$") for k in cond)):
+                _set_path(seed, key, _store_value(cond))
+        seed.setdefault("_id", ObjectId())
+        return self._apply_update(seed, update, inserting=True)
+
+    def _update(self, filter, update, upsert, many):
+        matched = modified = 0
+        upserted_id = None
+        with _command(self._listeners, "update"), self._lock:
+            targets = [d for d in self._candidates(filter) if _matches(d, filter)]
+            if not many:
+                targets = targets[:1]
+            for doc in targets:
+                new = self._apply_update(doc, update)
+                matched += 1
+                if new != doc:
+                    self._replace(doc, new)
+                    modified += 1
+            if not targets and upsert:
+                upserted_id = self._insert(self._upsert_doc(filter, update))
+        raw = {"n": matched + (1 if upserted_id is not None else 0), "nModified": modified}
+        if upserted_id is not None:
+            raw["upserted"] = upserted_id
+        return UpdateResult(raw, True)
+
+    def update_one(self, filter: Dict, update: Dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        return self._update(filter, update, upsert, many=False)
+
+    def update_many(self, filter: Dict, update: Dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        return self._update(filter, update, upsert, many=True)
+
+    def find_one_and_update(self, filter: Dict, update: Dict, projection: Dict = None,
+                            sort=None, upsert: bool = False,
+                            return_document=ReturnDocument.BEFORE, **kwargs):
+        with _command(self._listeners, "findAndModify"), self._lock:
+            docs = self._select(filter, _normalize_keys(sort) if sort else None, limit=1)
+            if not docs:
+                if not upsert:
+                    return None
+                new = self._upsert_doc(filter, update)
+                self._insert(new)
+                return _project(new, projection) if return_document == ReturnDocument.AFTER else None
+            old = docs[0]
+            new = self._apply_update(old, update)
+            if new != old:
+                self._replace(old, new)
+            return _project(new if return_document == ReturnDocument.AFTER else old, projection)
+
+    def delete_many(self, filter: Dict, **kwargs) -> DeleteResult:
+        with _command(self._listeners, "delete"), self._lock:
+            docs = [d for d in self._candidates(filter) if _matches(d, filter)]
+            for doc in docs:
+                for index in self._indexes.values():
+                    index.remove(doc)
+                del self._docs[doc["_id"]]
+        return DeleteResult({"n": len(docs)}, True)
@@ -0,0 +1,48 @@
+# ==========================================
+# Traffic Capture
+# ==========================================
+# Opt-in recording of real traffic in bench/loadtest.py's trace format, so a
+# production incident can be replayed against a scratch DB:
+#   TRACE_FILE=/tmp/flub-trace.ndjson     enable, append one JSON line per request
+#   TRACE_SAMPLE_RATE=0.1                 record a fraction of requests (default all)
+#
+# Lines carry the full request (path with query string, JSON body) because
+# replay needs them verbatim; treat trace files like the database itself.
+# "t" is wall-clock seconds; loadtest.py rebases it to the first request.
+# ==========================================
+
+import json
+import logging
+import os
+import random
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger("flub.traffic")
+
+TRACE_FILE = os.getenv("TRACE_FILE")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1"))
+
+_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return bool(TRACE_FILE)
+
+
+def record(method: str, path: str, body: Optional[Dict], status: Optional[int],
+           duration_ms: float, started: float):
+    """Append one served request to TRACE_FILE (no-op when capture is off)"""
+    if not TRACE_FILE or random.random() >= TRACE_SAMPLE_RATE:
+        return
+    entry = {"t": round(started, 6), "method": method, "path": path}
+    if body is not None:
+        entry["body"] = body
+    entry["status"] = status
+    entry["ms"] = round(duration_ms, 3)
+    line = json.dumps(entry) + "\n"
+    try:
+        with _lock, open(TRACE_FILE, "a") as f:
+            f.write(line)
+    except OSError as e:
+        logger.warning("Could not write trace to %s: %s", TRACE_FILE, e)
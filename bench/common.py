@@ -0,0 +1,144 @@
+# ==========================================
+# Benchmark Helpers - Seeding & Timing
+# ==========================================
+# Shared helpers for the bench/ scripts. Importing this module points
+# api/database.py at a scratch database (MONGODB_DB, default "flub_bench")
+# before the module-level MongoClient is created. With FLUB_STORAGE=memory
+# the scripts run against the in-memory engine instead (no mongod needed);
+# it reports each operation under the Mongo command name it stands for, so
+# command counts and the suite's thresholds still apply.
+# ==========================================
+
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from pymongo import monitoring
+
+os.environ.setdefault("MONGODB_DB", "flub_bench")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "api"))
+
+# Handshake/session housekeeping the driver sends on its own
+_IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "endSessions", "saslStart", "saslContinue"}
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts Mongo commands (round trips) issued by the application"""
+
+    def __init__(self):
+        self.count = 0
+        self.by_name = {}
+
+    def reset(self):
+        self.count = 0
+        self.by_name = {}
+
+    def started(self, event):
+        if event.command_name in _IGNORED_COMMANDS:
+            return
+        self.count += 1
+        self.by_name[event.command_name] = self.by_name.get(event.command_name, 0) + 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+# Must be registered before database.py creates its MongoClient
+command_counter = CommandCounter()
+monitoring.register(command_counter)
+
+import database  # noqa: E402
+from metrics import percentiles  # noqa: E402
+
+# monitoring.register() only reaches MongoClients; hand it to the memory engine
+if database.storage.name == "memory":
+    database.storage.event_listeners.append(command_counter)
+
+USER_SHARES = 100.0
+
+
+def bench_wallet(i: int) -> str:
+    """Deterministic fake wallet address for seeded user i"""
+    return f"Bench{i:040d}"
+
+
+def seed(users: int, deposits: int, trades: int, withdrawals: int, rng_seed: int = 42) -> list:
+    """
+    Drop the scratch DB and fill it with random history. Returns wallets.
+    Each user holds USER_SHARES shares at NAV $1.00. Ends with the
+    production indexes in place (built after the bulk inserts).
+    """
+    if database.storage.name == "mongo" and database.DB_NAME == "flub":
+        raise SystemExit("Refusing to seed the production database (set MONGODB_DB)")
+
+    database.storage.drop()
+
+    rng = random.Random(rng_seed)
+    now = datetime.utcnow()
+    wallets = [bench_wallet(i) for i in range(users)]
+
+    def ts():
+        return now - timedelta(seconds=rng.randint(0, 86400 * 365))
+
+    if users:
+        database.users_collection.insert_many([
+            {"walletAddress": w, "shares": USER_SHARES, "allocation": 100.0 / users,
+             "totalDeposited": USER_SHARES, "totalWithdrawn": 0.0, "holdings": {},
+             "joinedDate": ts(), "lastLogin": now, "isActive": True}
+            for w in wallets
+        ])
+    database.pool_state_collection.insert_one(
+        {"_id": "pool", "totalShares": USER_SHARES * users, "initialized": now}
+    )
+    if deposits and wallets:
+        database.deposits_collection.insert_many([
+            {"userId": rng.choice(wallets), "amount": 100.0, "currency": "USDC",
+             "txHash": f"dep{i}", "shares": 100.0, "nav": 1.0,
+             "timestamp": ts(), "status": "completed"}
+            for i in range(deposits)
+        ])
+    if trades:
+        database.trades_collection.insert_many([
+            {"coin": "SOL", "type": rng.choice(["buy", "sell"]), "amount": 1.0,
+             "price": 150.0, "timestamp": ts(), "userAllocations": {}}
+            for _ in range(trades)
+        ])
+    if withdrawals and wallets:
+        database.withdrawals_collection.insert_many([
+            {"userId": rng.choice(wallets), "amount": 10.0, "currency": "USDC",
+             "txHash": None, "shares": 10.0, "nav": 1.0,
+             "timestamp": ts(), "status": "completed"}
+            for _ in range(withdrawals)
+        ])
+    create_indexes()
+    return wallets
+
+
+def create_indexes():
+    """Recreate the indexes api/database.py creates at startup"""
+    database.storage.ensure_indexes()
+
+
+def latency_summary(samples_ms) -> dict:
+    """percentiles() of latency samples, keyed p50Ms/p90Ms/p99Ms/maxMs"""
+    return {f"{name}Ms": value for name, value in percentiles(samples_ms).items()}
+
+
+def time_call(fn, repeat: int) -> dict:
+    """Call fn repeat times and summarise wall-clock latency in ms"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    samples.sort()
+    return {
+        "minMs": round(samples[0], 3),
+        "medianMs": round(samples[len(samples) // 2], 3),
+        "maxMs": round(samples[-1], 3),
+    }
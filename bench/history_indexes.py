@@ -0,0 +1,89 @@
+# ==========================================
+# Benchmark - Transaction History Indexes
+# ==========================================
+# Seeds a scratch database with deposits, trades and withdrawals, then times
+# the history reads (per-user and admin-wide) with and without the
+# userId/timestamp compound indexes created by api/database.py.
+#
+# Usage:
+#   MONGODB_URI=mongodb://localhost:27017/ python bench/history_indexes.py \
+#       --users 1000 --deposits 20000 --trades 5000 --withdrawals 5000
+#
+# Never point this at the production database: it drops the scratch DB.
+# ==========================================
+
+import argparse
+import itertools
+import json
+import random
+
+from common import database, seed, create_indexes, time_call
+
+HISTORY_COLLECTIONS = {
+    "deposits": database.deposits_collection,
+    "trades": database.trades_collection,
+    "withdrawals": database.withdrawals_collection,
+}
+
+
+def drop_history_indexes():
+    """Drop every secondary index on the history collections"""
+    for coll in HISTORY_COLLECTIONS.values():
+        coll.drop_indexes()
+
+
+def docs_examined(coll, query: dict) -> int:
+    """totalDocsExamined for a timestamp-sorted find, from explain()"""
+    plan = coll.find(query).sort("timestamp", -1).explain()
+    return plan.get("executionStats", {}).get("totalDocsExamined", -1)
+
+
+def run_suite(wallets: list, repeat: int) -> dict:
+    rng = random.Random(7)
+    sample_wallets = [rng.choice(wallets) for _ in range(repeat)]
+    wallet_iter = itertools.cycle(sample_wallets)
+
+    return {
+        "userHistory": time_call(
+            lambda: database.get_all_transactions(next(wallet_iter), False), repeat
+        ),
+        "adminHistory": time_call(
+            lambda: database.get_all_transactions(None, True), max(1, repeat // 10)
+        ),
+        "adminStats": time_call(
+            lambda: database.get_admin_stats(100.0 * len(wallets)), repeat
+        ),
+        "docsExamined": {
+            "userDeposits": docs_examined(database.deposits_collection, {"userId": sample_wallets[0]}),
+            "userWithdrawals": docs_examined(database.withdrawals_collection, {"userId": sample_wallets[0]}),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark history reads with/without indexes")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--deposits", type=int, default=20000)
+    parser.add_argument("--trades", type=int, default=5000)
+    parser.add_argument("--withdrawals", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    wallets = seed(args.users, args.deposits, args.trades, args.withdrawals)
+
+    create_indexes()
+    indexed = run_suite(wallets, args.repeat)
+
+    drop_history_indexes()
+    unindexed = run_suite(wallets, args.repeat)
+
+    create_indexes()
+    print(json.dumps({
+        "dataset": vars(args),
+        "withIndexes": indexed,
+        "withoutIndexes": unindexed,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+# ==========================================
+# Load Test - api/index.py HTTP Routes
+# ==========================================
+# Starts the api/index.py handler on a local ThreadingHTTPServer (or targets
+# an already running server) and drives a weighted route mix at a fixed
+# request rate with concurrent clients. Reports per-route latency
+# histograms, percentiles and error rates as JSON.
+#
+# Latency is measured from each request's SCHEDULED send time, so a stalled
+# server shows up as queueing delay instead of silently lowering the rate.
+#
+# Usage:
+#   ADMIN_WALLETS=<wallet> python bench/loadtest.py --rate 50 --duration 30
+#   python bench/loadtest.py --mix mix.json --clients 32 --record trace.ndjson
+#   python bench/loadtest.py --replay trace.ndjson --speed 2.0
+#
+# Real traffic: run the API with TRACE_FILE=/path/trace.ndjson (see
+# api/traffic.py) and replay that file. Admin requests in it only pass if
+# ADMIN_WALLETS here includes the wallet they were sent with.
+#
+# --users seeds the LOCAL scratch DB (MONGODB_DB) and builds the production
+# indexes; pass --users 0 when targeting a remote server or replaying
+# against existing data (a local server still gets the indexes).
+#
+# Mix file: {"route name": weight, ...} using route names from DEFAULT_MIX.
+# Trace file: one JSON object per line:
+#   {"t": <seconds>, "method": "GET", "path": "/api/...", "body": {...}}
+# Times are rebased so the first request is sent immediately.
+#
+# errorRate counts connection failures and 5xx; 4xx are reported separately
+# as clientErrorRate (a 403 means the admin wallet is wrong, not a slow server).
+# ==========================================
+
+import argparse
+import itertools
+import json
+import queue
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+from common import USER_SHARES, create_indexes, database, latency_summary, seed
+
+# Dashboards polling dominate; deposits and autotrader trades come in bursts
+DEFAULT_MIX = {
+    "leaderboard": 30,
+    "position": 30,
+    "pool_state": 20,
+    "transactions": 8,
+    "admin_stats": 5,
+    "deposit": 4,
+    "trade": 3,
+}
+
+# Routes that need ADMIN_WALLETS; without one they'd only measure 403s
+ADMIN_ROUTES = {"admin_stats", "trade"}
+
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+
+class RequestFactory:
+    """Builds concrete requests for each named route against the seeded data"""
+
+    def __init__(self, wallets: list, admin_wallet: str, rng_seed: int = 1):
+        self.wallets = wallets
+        self.admin_wallet = admin_wallet
+        self.pool_value = USER_SHARES * len(wallets)
+        self.rng = random.Random(rng_seed)
+        self.tx_seq = itertools.count()
+        self.lock = threading.Lock()
+
+    def build(self, route: str) -> dict:
+        with self.lock:
+            wallet = self.rng.choice(self.wallets)
+            tx = next(self.tx_seq)
+        pv = self.pool_value
+        if route == "leaderboard":
+            return {"method": "GET", "path": f"/api/leaderboard?poolValue={pv}"}
+        if route == "position":
+            return {"method": "GET", "path": f"/api/user/position?wallet={wallet}&poolValue={pv}"}
+        if route == "pool_state":
+            return {"method": "GET", "path": "/api/pool/state"}
+        if route == "transactions":
+            return {"method": "GET", "path": f"/api/transactions?wallet={wallet}"}
+        if route == "admin_stats":
+            return {"method": "GET", "path": f"/api/admin/stats?wallet={self.admin_wallet}&poolValue={pv}"}
+        if route == "deposit":
+            return {"method": "POST", "path": "/api/deposit", "body": {
+                "walletAddress": wallet, "amount": 10.0,
+                "txHash": f"load-{time.time_ns()}-{tx}", "totalPoolValue": pv + 10.0
+            }}
+        if route == "trade":
+            return {"method": "POST", "path": "/api/trade", "body": {
+                "adminWallet": self.admin_wallet, "coin": "SOL",
+                "type": "buy", "amount": 1.0, "price": 150.0
+            }}
+        raise ValueError(f"Unknown route: {route}")
+
+
+def route_name(request: dict) -> str:
+    """Group requests by path without query string (for replayed traces)"""
+    return request.get("route") or request["path"].split("?")[0]
+
+
+def send(base_url: str, request: dict, timeout: float) -> int:
+    """Send one request, return HTTP status (0 on connection error)"""
+    data = None
+    headers = {}
+    if request.get("body") is not None:
+        data = json.dumps(request["body"]).encode("utf-8")
+        headers["Content-Type"] = "application/json"
+    req = urllib.request.Request(base_url + request["path"], data=data,
+                                 headers=headers, method=request["method"])
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, OSError):
+        return 0
+
+
+class Stats:
+    """Thread-safe per-route latency samples and status counts"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.statuses = {}
+
+    def add(self, route: str, latency_ms: float, status: int):
+        with self.lock:
+            self.samples.setdefault(route, []).append(latency_ms)
+            counts = self.statuses.setdefault(route, {})
+            counts[status] = counts.get(status, 0) + 1
+
+    def report(self, elapsed: float) -> dict:
+        routes = {}
+        for route, samples in sorted(self.samples.items()):
+            statuses = self.statuses[route]
+            errors = sum(n for code, n in statuses.items() if code == 0 or code >= 500)
+            client_errors = sum(n for code, n in statuses.items() if 400 <= code < 500)
+            histogram = {}
+            for bound in HISTOGRAM_BUCKETS_MS:
+                histogram[f"<={bound}ms"] = sum(1 for s in samples if s <= bound)
+            histogram["+Inf"] = len(samples)
+            routes[route] = {
+                "count": len(samples),
+                "throughputRps": round(len(samples) / elapsed, 2) if elapsed > 0 else 0,
+                "errorRate": round(errors / len(samples), 4),
+                "clientErrorRate": round(client_errors / len(samples), 4),
+                "statuses": {str(k): v for k, v in sorted(statuses.items())},
+                **latency_summary(samples),
+                "histogram": histogram,
+            }
+        total = sum(r["count"] for r in routes.values())
+        return {
+            "elapsedSeconds": round(elapsed, 3),
+            "totalRequests": total,
+            "throughputRps": round(total / elapsed, 2) if elapsed > 0 else 0,
+            "routes": routes,
+        }
+
+
+def generate_schedule(factory: RequestFactory, mix: dict, rate: float, duration: float,
+                      rng_seed: int = 2) -> list:
+    """Poisson arrivals at `rate` req/s for `duration` seconds, routes drawn by weight"""
+    rng = random.Random(rng_seed)
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    schedule = []
+    t = 0.0
+    while True:
+        t += rng.expovariate(rate)
+        if t >= duration:
+            break
+        route = rng.choices(names, weights)[0]
+        request = factory.build(route)
+        request["t"] = t
+        request["route"] = route
+        schedule.append(request)
+    return schedule
+
+
+def load_trace(path: str) -> list:
+    with open(path) as f:
+        schedule = [json.loads(line) for line in f if line.strip()]
+    schedule.sort(key=lambda r: r["t"])
+    # Captured traces carry wall-clock times
+    if schedule:
+        first = schedule[0]["t"]
+        for request in schedule:
+            request["t"] -= first
+    return schedule
+
+
+def save_trace(path: str, schedule: list):
+    with open(path, "w") as f:
+        for request in schedule:
+            f.write(json.dumps(request) + "\n")
+
+
+def run(base_url: str, schedule: list, clients: int, speed: float, timeout: float) -> dict:
+    """Dispatch the schedule to `clients` worker threads, honouring send times"""
+    jobs = queue.Queue(maxsize=clients * 4)
+    stats = Stats()
+
+    def worker():
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            scheduled_at, request = job
+            status = send(base_url, request, timeout)
+            stats.add(route_name(request), (time.perf_counter() - scheduled_at) * 1000.0, status)
+
+    workers = [threading.Thread(target=worker, daemon=True) for _ in range(clients)]
+    for w in workers:
+        w.start()
+
+    start = time.perf_counter()
+    for request in schedule:
+        scheduled_at = start + request["t"] / speed
+        delay = scheduled_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        jobs.put((scheduled_at, request))
+
+    for _ in workers:
+        jobs.put(None)
+    for w in workers:
+        w.join()
+    return stats.report(time.perf_counter() - start)
+
+
+def start_local_server(port: int) -> ThreadingHTTPServer:
+    """Serve api/index.py's handler in a background thread"""
+    import index
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), index.handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the api/index.py routes")
+    parser.add_argument("--target", help="Base URL of a running server (default: start one locally)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--mix", help="JSON file of {route: weight}")
+    parser.add_argument("--rate", type=float, default=20.0, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of generated traffic")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent client threads")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--users", type=int, default=1000, help="Users to seed (0 = keep existing data)")
+    parser.add_argument("--deposits", type=int, default=5000)
+    parser.add_argument("--trades", type=int, default=1000)
+    parser.add_argument("--withdrawals", type=int, default=1000)
+    parser.add_argument("--record", help="Write the generated schedule as a replayable trace")
+    parser.add_argument("--replay", help="Replay a recorded trace instead of generating traffic")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier")
+    parser.add_argument("--output", help="Write JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    # Seeding resets the scratch DB, so replayed deposit txHashes are fresh again
+    if args.users:
+        wallets = seed(args.users, args.deposits, args.trades, args.withdrawals)
+    else:
+        if not args.target:
+            # The local server must read through the production indexes, or
+            # the percentiles measure collection scans
+            create_indexes()
+        wallets = [u["walletAddress"] for u in database.users_collection.find({}, {"walletAddress": 1})]
+
+    if args.replay:
+        schedule = load_trace(args.replay)
+    else:
+        if not wallets:
+            raise SystemExit("No users to generate traffic for")
+        mix = DEFAULT_MIX
+        if args.mix:
+            with open(args.mix) as f:
+                mix = json.load(f)
+        admin_routes = sorted(r for r in ADMIN_ROUTES if mix.get(r))
+        if admin_routes and not database.ADMIN_WALLETS:
+            raise SystemExit(
+                f"Mix includes admin routes {admin_routes}; set ADMIN_WALLETS "
+                "or drop them from --mix"
+            )
+        admin_wallet = database.ADMIN_WALLETS[0] if database.ADMIN_WALLETS else None
+        factory = RequestFactory(wallets, admin_wallet)
+        schedule = generate_schedule(factory, mix, args.rate, args.duration)
+        if args.record:
+            save_trace(args.record, schedule)
+
+    server = None
+    base_url = args.target
+    if not base_url:
+        server = start_local_server(args.port)
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        report = run(base_url, schedule, args.clients, args.speed, args.timeout)
+    finally:
+        if server:
+            server.shutdown()
+
+    report["config"] = {
+        "target": base_url, "clients": args.clients, "speed": args.speed,
+        "replay": args.replay, "rate": None if args.replay else args.rate,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
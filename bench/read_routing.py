@@ -0,0 +1,105 @@
+# ==========================================
+# Benchmark - Write Latency Under Heavy Read Load
+# ==========================================
+# Measures record_deposit latency while reader threads hammer the heavy
+# admin reads (leaderboard, admin stats, admin transaction history), once
+# with every read on the primary and once with database.READ_ROUTES as
+# configured (secondaries with bounded staleness).
+#
+# Usage (needs a replica set, see bench/replset.sh):
+#   MONGODB_URI="mongodb://localhost:27017,localhost:27018,localhost:27019/?replicaSet=rs0" \
+#       python bench/read_routing.py --users 5000 --deposits 50000 --readers 8
+#
+# Never point this at the production database: it drops the scratch DB.
+# ==========================================
+
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+
+from common import USER_SHARES, database, seed, create_indexes, latency_summary
+
+HEAVY_READS = ["get_leaderboard", "get_admin_stats", "get_all_transactions_admin"]
+
+
+def run_phase(wallets: list, readers: int, writes: int, tx_seq) -> dict:
+    pool_value = USER_SHARES * len(wallets)
+    stop = threading.Event()
+    read_counts = [0] * readers
+
+    def reader(i):
+        rng = random.Random(i)
+        while not stop.is_set():
+            name = rng.choice(HEAVY_READS)
+            if name == "get_leaderboard":
+                database.get_leaderboard(pool_value)
+            elif name == "get_admin_stats":
+                database.get_admin_stats(pool_value)
+            else:
+                database.get_all_transactions(None, True)
+            read_counts[i] += 1
+
+    threads = [threading.Thread(target=reader, args=(i,), daemon=True) for i in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(1.0)  # let the read load build up
+
+    rng = random.Random(99)
+    samples = []
+    started = time.perf_counter()
+    for _ in range(writes):
+        start = time.perf_counter()
+        database.record_deposit(rng.choice(wallets), 10.0, f"route-{next(tx_seq)}", pool_value + 10.0)
+        samples.append((time.perf_counter() - start) * 1000.0)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    for t in threads:
+        t.join()
+    return {
+        "depositLatency": {"count": len(samples), **latency_summary(samples)} if samples else {},
+        "heavyReadsCompleted": sum(read_counts),
+        "heavyReadsPerSecond": round(sum(read_counts) / elapsed, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deposit latency under read load, primary vs routed reads")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--deposits", type=int, default=20000)
+    parser.add_argument("--trades", type=int, default=5000)
+    parser.add_argument("--withdrawals", type=int, default=2000)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=200)
+    args = parser.parse_args()
+
+    hello = database.client.admin.command("hello")
+    if not hello.get("setName"):
+        print("WARNING: not connected to a replica set; both phases will read from the same node")
+
+    wallets = seed(args.users, args.deposits, args.trades, args.withdrawals)
+    create_indexes()
+    tx_seq = itertools.count()
+
+    routed = dict(database.READ_ROUTES)
+    database.configure_read_routes({name: "primary" for name in routed})
+    primary_only = run_phase(wallets, args.readers, args.writes, tx_seq)
+
+    database.configure_read_routes(routed)
+    with_routing = run_phase(wallets, args.readers, args.writes, tx_seq)
+
+    print(json.dumps({
+        "dataset": vars(args),
+        "replicaSet": hello.get("setName"),
+        "maxStalenessSeconds": database.READ_MAX_STALENESS_SECONDS,
+        "routes": routed,
+        "allReadsOnPrimary": primary_only,
+        "heavyReadsRouted": with_routing,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
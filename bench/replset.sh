@@ -0,0 +1,40 @@
+#!/usr/bin/env bash
+# ==========================================
+# Local three-member replica set for read-routing tests
+# ==========================================
+# Starts mongod on ports 27017-27019 (replica set "rs0") with data under
+# ${RS_DIR:-/tmp/flub-rs} and initiates it. Stop with: bench/replset.sh stop
+#
+#   export MONGODB_URI="mongodb://localhost:27017,localhost:27018,localhost:27019/?replicaSet=rs0"
+# ==========================================
+set -euo pipefail
+
+RS_DIR="${RS_DIR:-/tmp/flub-rs}"
+PORTS=(27017 27018 27019)
+
+if [[ "${1:-start}" == "stop" ]]; then
+    for port in "${PORTS[@]}"; do
+        mongod --dbpath "$RS_DIR/$port" --shutdown || true
+    done
+    exit 0
+fi
+
+for port in "${PORTS[@]}"; do
+    mkdir -p "$RS_DIR/$port"
+    mongod --replSet rs0 --port "$port" --bind_ip localhost \
+        --dbpath "$RS_DIR/$port" --logpath "$RS_DIR/$port.log" --fork
+done
+
+mongosh --quiet --port 27017 --eval '
+try {
+    rs.status();
+} catch (e) {
+    rs.initiate({_id: "rs0", members: [
+        {_id: 0, host: "localhost:27017", priority: 2},
+        {_id: 1, host: "localhost:27018"},
+        {_id: 2, host: "localhost:27019"}
+    ]});
+}
+while (!db.hello().isWritablePrimary) { sleep(500); }
+print("rs0 ready");
+'
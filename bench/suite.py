@@ -0,0 +1,132 @@
+# ==========================================
+# Benchmark Suite - database.py Cost vs Data Size
+# ==========================================
+# Seeds a scratch database, then times the hot database.py functions and
+# counts the Mongo commands (round trips) each call issues. Results are
+# printed as JSON and checked against bench/thresholds.json so a new N+1
+# query pattern fails the run (exit code 1).
+#
+# Usage:
+#   MONGODB_URI=mongodb://localhost:27017/ python bench/suite.py --scale 10k
+#   python bench/suite.py --users 5000 --deposits 50000 --output result.json
+#
+# Never point this at the production database: it drops the scratch DB.
+# ==========================================
+
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+
+from common import USER_SHARES, database, seed, time_call, command_counter
+
+SCALES = {
+    "1k": {"users": 1000, "deposits": 1000, "trades": 1000, "withdrawals": 1000},
+    "10k": {"users": 10000, "deposits": 10000, "trades": 10000, "withdrawals": 10000},
+    "100k": {"users": 100000, "deposits": 100000, "trades": 100000, "withdrawals": 100000},
+}
+
+DEFAULT_THRESHOLDS = os.path.join(os.path.dirname(__file__), "thresholds.json")
+
+
+def count_commands(fn) -> dict:
+    """Run fn once and return the Mongo commands it issued"""
+    command_counter.reset()
+    fn()
+    return {"count": command_counter.count, "byName": dict(command_counter.by_name)}
+
+
+def build_cases(wallets: list) -> dict:
+    """Benchmark cases: name -> zero-arg callable"""
+    rng = random.Random(11)
+    pool_value = USER_SHARES * len(wallets)
+    admin_wallet = database.ADMIN_WALLETS[0] if database.ADMIN_WALLETS else None
+    deposit_seq = itertools.count()
+
+    def deposit():
+        # Pool value includes the incoming deposit, as the deposit route expects
+        database.record_deposit(rng.choice(wallets), 10.0, f"bench-{next(deposit_seq)}",
+                                pool_value + 10.0)
+
+    allocations = database.calculate_pool_allocations()
+
+    return {
+        "record_deposit": deposit,
+        "record_trade": lambda: database.record_trade("SOL", "buy", 1.0, 150.0, allocations),
+        "get_leaderboard": lambda: database.get_leaderboard(pool_value),
+        "get_user_positions": lambda: database.get_user_positions(
+            wallets[:database.MAX_POSITION_BATCH], pool_value),
+        "get_admin_stats": lambda: database.get_admin_stats(pool_value),
+        "get_all_transactions_user": lambda: database.get_all_transactions(rng.choice(wallets), False),
+        "get_all_transactions_admin": lambda: database.get_all_transactions(admin_wallet, True),
+        "calculate_pool_allocations": database.calculate_pool_allocations,
+    }
+
+
+def check_thresholds(results: dict, thresholds: dict, users: int) -> list:
+    """Return a list of human-readable threshold violations"""
+    failures = []
+    for name, result in results.items():
+        limit = thresholds.get(name)
+        if not limit:
+            continue
+        max_commands = limit.get("base", 0) + limit.get("perUser", 0.0) * users
+        if result["commands"]["count"] > max_commands:
+            failures.append(f"{name}: {result['commands']['count']} commands > {max_commands:g} allowed")
+        max_ms = limit.get("maxMedianMs")
+        if max_ms is not None and result["timing"]["medianMs"] > max_ms:
+            failures.append(f"{name}: median {result['timing']['medianMs']}ms > {max_ms}ms")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark database.py functions against a seeded scratch DB")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="1k")
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--deposits", type=int)
+    parser.add_argument("--trades", type=int)
+    parser.add_argument("--withdrawals", type=int)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="*", help="Run only these cases")
+    parser.add_argument("--thresholds", default=DEFAULT_THRESHOLDS)
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    dataset = dict(SCALES[args.scale])
+    for key in dataset:
+        if getattr(args, key) is not None:
+            dataset[key] = getattr(args, key)
+
+    wallets = seed(**dataset)
+    cases = build_cases(wallets)
+    if args.only:
+        cases = {k: v for k, v in cases.items() if k in args.only}
+
+    results = {}
+    for name, fn in cases.items():
+        commands = count_commands(fn)
+        timing = time_call(fn, args.repeat)
+        results[name] = {"commands": commands, "timing": timing}
+
+    with open(args.thresholds) as f:
+        thresholds = json.load(f)
+    failures = check_thresholds(results, thresholds, dataset["users"])
+
+    report = {"storage": database.storage.name, "dataset": dataset, "repeat": args.repeat,
+              "results": results, "failures": failures, "passed": not failures}
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    for failure in failures:
+        print(f"REGRESSION {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
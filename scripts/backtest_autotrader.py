@@ -0,0 +1,107 @@
+# ==========================================
+# AutoTrader Backtest CLI
+# ==========================================
+# Replays a recorded price series through the vectorized tier engine in
+# api/autotrader.py and prints a JSON summary (trades, final balances,
+# return, max drawdown).
+#
+# Price file (CSV): header "timestamp,BTC,ETH,...", one row per check.
+# timestamp is epoch milliseconds or ISO 8601 (UTC); empty cells = no quote.
+#
+# Usage:
+#   python scripts/backtest_autotrader.py prices.csv --usdc 5000
+#   python scripts/backtest_autotrader.py prices.csv --state trader_state.json \
+#       --balances '{"BTC": 0.05, "SOL": 20}' --fee 0.006 --trades
+# ==========================================
+
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "api"))
+
+from autotrader import backtest, default_state  # noqa: E402
+
+
+def parse_timestamp(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp() * 1000.0
+
+
+def load_prices(path: str):
+    """Returns (coins, timestamps_ms (T,), prices (T, C))"""
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        coins = header[1:]
+        timestamps, rows = [], []
+        for row in reader:
+            if not row:
+                continue
+            timestamps.append(parse_timestamp(row[0]))
+            rows.append([float(v) if v else np.nan for v in row[1:]])
+    order = np.argsort(timestamps, kind="stable")
+    return coins, np.array(timestamps)[order], np.array(rows, dtype=np.float64).reshape(-1, len(coins))[order]
+
+
+def max_drawdown(equity: np.ndarray) -> float:
+    if len(equity) == 0:
+        return 0.0
+    peaks = np.maximum.accumulate(equity)
+    return float(np.max((peaks - equity) / np.where(peaks > 0, peaks, 1.0)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the tier autotrader on recorded prices")
+    parser.add_argument("prices", help="CSV of timestamp + one price column per coin")
+    parser.add_argument("--state", help="trader_state JSON (default: all tiers active, default tiers)")
+    parser.add_argument("--usdc", type=float, default=1000.0, help="Starting USDC balance")
+    parser.add_argument("--balances", default="{}", help='Starting coin balances as JSON, e.g. {"BTC": 0.1}')
+    parser.add_argument("--fee", type=float, default=0.0, help="Fee rate per fill, e.g. 0.006")
+    parser.add_argument("--trades", action="store_true", help="Include every simulated trade")
+    args = parser.parse_args()
+
+    coins, timestamps, prices = load_prices(args.prices)
+    if args.state:
+        with open(args.state) as f:
+            state = json.load(f)
+    else:
+        state = default_state(coins)
+    start_balances = json.loads(args.balances)
+    balances = np.array([float(start_balances.get(c, 0.0)) for c in coins])
+
+    result = backtest(state, coins, timestamps, prices, args.usdc, balances, args.fee)
+
+    equity = result["equity"]
+    start_value = args.usdc + float(np.nansum(balances * prices[0])) if len(prices) else args.usdc
+    end_value = float(equity[-1]) if len(equity) else start_value
+    summary = {
+        "ticks": int(len(timestamps)),
+        "coins": coins,
+        "tradeCount": len(result["trades"]),
+        "buys": sum(1 for t in result["trades"] if t["side"] == "BUY"),
+        "sells": sum(1 for t in result["trades"] if t["side"] == "SELL"),
+        "startValue": round(start_value, 2),
+        "endValue": round(end_value, 2),
+        "returnPct": round((end_value / start_value - 1) * 100, 3) if start_value > 0 else 0,
+        "maxDrawdownPct": round(max_drawdown(equity) * 100, 3),
+        "finalUsdc": round(result["finalUsdc"], 2),
+        "finalHoldings": result["finalHoldings"],
+    }
+    if args.trades:
+        summary["trades"] = result["trades"]
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
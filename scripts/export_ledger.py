@@ -0,0 +1,165 @@
+# ==========================================
+# Ledger Export CLI
+# ==========================================
+# Streams deposits, trades and withdrawals from MongoDB as NDJSON or CSV for
+# accounting. Uses the same iter_ledger() as GET /api/admin/export, so
+# memory stays constant whatever the export size.
+#
+# Usage:
+#   MONGODB_URI=... python scripts/export_ledger.py --format csv \
+#       --from 2026-01-01 --to 2026-04-01 --output q1.csv
+#   # Interrupted? Pick up after the last complete row in the file:
+#   MONGODB_URI=... python scripts/export_ledger.py --format csv \
+#       --from 2026-01-01 --to 2026-04-01 --output q1.csv --resume
+#   # Check a file (also one saved from /api/admin/export) is complete:
+#   python scripts/export_ledger.py --format csv --verify q1.csv
+#
+# Complete exports end with a trailer line (type "end" plus the row count);
+# a file without one was cut short and should be resumed, not used.
+# ==========================================
+
+import argparse
+import csv
+import json
+import os
+import sys
+from typing import Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "api"))
+
+from database import LEDGER_FIELDS, iter_ledger, iter_ledger_lines, parse_ledger_time  # noqa: E402
+
+# Exit status of --verify for an incomplete or inconsistent file
+INCOMPLETE = 2
+
+
+def parse_line(line: str, fmt: str):
+    """Ledger row dict for one NDJSON/CSV line (None for the CSV header)"""
+    if fmt == "ndjson":
+        return json.loads(line)
+    row = next(csv.reader([line]))
+    if row[0] == "type":
+        return None
+    return dict(zip(LEDGER_FIELDS, row))
+
+
+def trailer_rows(row):
+    """Row count from an end trailer row, or None if row isn't a trailer"""
+    if not row or row.get("type") != "end":
+        return None
+    if "rows" in row:
+        return int(row["rows"])
+    return int(row["id"].split("=", 1)[1])
+
+
+def last_row(path: str, fmt: str):
+    """
+    Truncate any partially written final line, then return the last
+    complete line parsed (None if the file has no rows yet).
+    Reads backwards from the end so huge files are not loaded.
+    """
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        block = 64 * 1024
+        tail = b""
+        pos = size
+        # Grow the tail until it contains two newlines (or the whole file)
+        while pos > 0 and tail.count(b"\n") < 2:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            tail = f.read(step) + tail
+
+        end = tail.rfind(b"\n")
+        if end == -1:
+            f.truncate(0)
+            return None
+        # Drop an unterminated trailing fragment from an interrupted write
+        f.truncate(pos + end + 1)
+
+        lines = tail[:end].split(b"\n")
+        last = lines[-1].decode("utf-8")
+
+    return parse_line(last, fmt) if last else None
+
+
+def count_rows(path: str, fmt: str) -> Tuple[int, Optional[int]]:
+    """(data rows, trailer row count or None) - streams the file once"""
+    rows, trailer = 0, None
+    with open(path, newline="") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                return rows, None  # interrupted mid-line
+            row = parse_line(line, fmt)
+            if row is None:
+                continue
+            if trailer is not None:
+                return rows, None  # data after a trailer: not one clean export
+            trailer = trailer_rows(row)
+            if trailer is None:
+                rows += 1
+    return rows, trailer
+
+
+def verify(path: str, fmt: str) -> int:
+    rows, trailer = count_rows(path, fmt)
+    if trailer is None:
+        print(f"{path}: INCOMPLETE - no end trailer after {rows} rows", file=sys.stderr)
+        return INCOMPLETE
+    if trailer != rows:
+        print(f"{path}: INCONSISTENT - trailer says {trailer} rows, file has {rows}", file=sys.stderr)
+        return INCOMPLETE
+    print(f"{path}: complete, {rows} rows", file=sys.stderr)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream the pool ledger as NDJSON or CSV")
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--from", dest="start", help="Inclusive start (ISO 8601, UTC)")
+    parser.add_argument("--to", dest="end", help="Exclusive end (ISO 8601, UTC)")
+    parser.add_argument("--wallet", help="Only rows for this wallet")
+    parser.add_argument("--after", help="Checkpoint token to resume after")
+    parser.add_argument("--output", help="Output file (default: stdout)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Append to --output, resuming after its last complete row")
+    parser.add_argument("--verify", metavar="FILE",
+                        help="Check FILE ends with a matching end trailer, then exit")
+    args = parser.parse_args()
+
+    if args.verify:
+        sys.exit(verify(args.verify, args.format))
+
+    after = args.after
+    header = True
+    mode = "w"
+    rows_before = 0
+    if args.resume:
+        if not args.output:
+            parser.error("--resume requires --output")
+        if os.path.exists(args.output) and os.path.getsize(args.output) > 0:
+            last = last_row(args.output, args.format)
+            if trailer_rows(last) is not None:
+                print(f"{args.output} is already complete", file=sys.stderr)
+                return
+            if last and last.get("checkpoint"):
+                after = last["checkpoint"]
+            header = os.path.getsize(args.output) == 0
+            rows_before = count_rows(args.output, args.format)[0]
+            mode = "a"
+
+    rows = iter_ledger(parse_ledger_time(args.start), parse_ledger_time(args.end), args.wallet, after)
+    lines = iter_ledger_lines(rows, args.format, header=header, rows_before=rows_before)
+
+    out = open(args.output, mode, newline="") if args.output else sys.stdout
+    try:
+        for line in lines:
+            out.write(line)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+// ==========================================
+// Node harness: run js/autotrader.js against a price series
+// ==========================================
+// Loads the browser AutoTrader unchanged into a vm context with stubbed
+// browser/API globals, then calls its real _checkPrices() once per tick.
+// Orders fill at the tick price; balances refresh after each check, the
+// way API.refreshData() does after trades in the browser.
+//
+// stdin:  {"state": {...trader_state}, "coins": [...], "timestamps": [...],
+//          "prices": [[...], ...] (null = no quote), "usdc": N, "balances": {...}}
+// stdout: {"trades": [{tick, coin, side, quantity, price}], "targets": {...}}
+// ==========================================
+
+const fs = require('fs');
+const path = require('path');
+const vm = require('vm');
+
+const input = JSON.parse(fs.readFileSync(0, 'utf8'));
+const source = fs.readFileSync(path.join(__dirname, '..', 'js', 'autotrader.js'), 'utf8');
+
+let now = 0;
+let prices = {};
+let tick = 0;
+const trades = [];
+const storage = new Map();
+
+const portfolio = {
+    assets: [
+        { code: 'USDC', balance: input.usdc, usd_value: input.usdc },
+        ...input.coins.map(code => ({ code, balance: input.balances[code] || 0, usd_value: 0 })),
+    ],
+};
+const asset = code => portfolio.assets.find(a => a.code === code);
+
+class FakeDate extends Date {
+    static now() { return now; }
+}
+
+const context = {
+    console,
+    Math,
+    JSON,
+    Object,
+    Date: FakeDate,
+    setInterval: () => 1,
+    clearInterval: () => {},
+    localStorage: {
+        getItem: k => (storage.has(k) ? storage.get(k) : null),
+        setItem: (k, v) => storage.set(k, String(v)),
+        removeItem: k => storage.delete(k),
+    },
+    document: { getElementById: () => null, querySelectorAll: () => [] },
+    Logger: { log: () => {} },
+    State: { portfolioData: portfolio },
+    API: {
+        getRealtimePrice: code => prices[code],
+        refreshData: async () => {},
+        placeOrder: async order => {
+            const side = order.orderType === 'MARKET_BUY' ? 'BUY' : 'SELL';
+            trades.push({ tick, coin: order.secondary, side, quantity: order.quantity, price: prices[order.secondary] });
+            return { ok: true, text: async () => '' };
+        },
+    },
+};
+vm.createContext(context);
+vm.runInContext(source + '\nglobalThis.AutoTrader = AutoTrader;', context);
+
+const AT = context.AutoTrader;
+const state = input.state;
+for (const t of [1, 2, 3]) {
+    if (state.autoTiers && state.autoTiers['tier' + t]) AT['tier' + t] = state.autoTiers['tier' + t];
+}
+AT.tierAssignments = state.autoTierAssignments || {};
+AT.cooldowns = { ...(state.autoCooldowns || {}) };
+AT.targets = JSON.parse(JSON.stringify(state.autoActive.targets));
+AT.tierActive = { 1: false, 2: false, 3: false };
+for (const [t, on] of Object.entries(state.autoActive.tierActive || {})) AT.tierActive[t] = !!on;
+AT._isOwner = true;
+
+// UI / persistence side effects that don't affect decisions
+for (const name of ['_saveActiveState', '_updateStatus', 'renderTierCards', '_renderTradeLog', '_addTradeLog', '_updateUI']) {
+    AT[name] = () => {};
+}
+AT._verifyOwnership = async () => true;
+
+(async () => {
+    for (tick = 0; tick < input.timestamps.length; tick++) {
+        now = input.timestamps[tick];
+        prices = {};
+        input.coins.forEach((code, j) => {
+            const p = input.prices[tick][j];
+            if (p !== null) prices[code] = p;
+        });
+
+        const before = trades.length;
+        await AT._checkPrices();
+
+        // refreshData() after the check: apply this tick's fills
+        for (const tr of trades.slice(before)) {
+            const value = tr.quantity * tr.price;
+            const usdc = asset('USDC');
+            const coin = asset(tr.coin);
+            if (tr.side === 'BUY') {
+                usdc.balance -= value; coin.balance += tr.quantity;
+            } else {
+                usdc.balance += value; coin.balance -= tr.quantity;
+            }
+            usdc.usd_value = usdc.balance;
+        }
+    }
+    process.stdout.write(JSON.stringify({ trades, targets: AT.targets }));
+})();
@@ -0,0 +1,71 @@
+# ==========================================
+# Test setup
+# ==========================================
+# Tests run database.py on the in-memory storage backend, so no mongod is
+# needed. Every test gets a fresh, empty store through the `db` fixture;
+# `api` serves api/index.py's handler on top of it.
+# ==========================================
+
+import json
+import os
+import sys
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import base58
+from nacl.signing import SigningKey
+
+# Admin with a real key, for routes that need an admin signature
+ADMIN_KEY = SigningKey(bytes(range(32)))
+ADMIN_WALLET = base58.b58encode(bytes(ADMIN_KEY.verify_key)).decode()
+
+os.environ.setdefault("FLUB_STORAGE", "memory")
+os.environ.setdefault("ADMIN_WALLETS", f"ADMIN1,{ADMIN_WALLET}")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "api"))
+
+import pytest
+
+import database
+from metrics import command_listener
+from storage import MemoryStorage
+
+
+@pytest.fixture
+def db():
+    # Same listener as the default backend, so request metrics see commands
+    previous = database.use_storage(MemoryStorage(event_listeners=[command_listener]))
+    yield database
+    database.use_storage(previous)
+
+
+@pytest.fixture
+def admin():
+    """(wallet, SigningKey) of an admin listed in ADMIN_WALLETS"""
+    return ADMIN_WALLET, ADMIN_KEY
+
+
+@pytest.fixture
+def api(db):
+    """call(method, path, body=None) -> (status, JSON body) against index.handler"""
+    import index
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), index.handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def call(method, path, body=None):
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        req = urllib.request.Request(base_url + path, data=data, method=method,
+                                     headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=10) as resp:
+                return resp.status, json.loads(resp.read() or b"null")
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read() or b"null")
+
+    call.base_url = base_url
+    yield call
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+API_DIR = os.path.join(os.path.dirname(__file__), "..", "api")
+
+
+def test_pool_state_route(api, db):
+    db.pool_state_collection.insert_one(
+        {"_id": "pool", "totalShares": 10.0, "initialized": datetime(2026, 1, 1)}
+    )
+    assert api("GET", "/api/pool/state") == \
+        (200, {"totalShares": 10.0, "initialized": "2026-01-01T00:00:00"})
+
+
+
+def test_index_does_not_load_numpy():
+    # Every cold start imports index; only the evaluate route needs NumPy
+    code = "import sys, index; print('numpy' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=API_DIR,
+                         capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
+
+
+def test_autotrader_evaluate_route(api):
+    status, result = api("POST", "/api/admin/autotrader/evaluate", {
+        "adminWallet": "ADMIN1", "prices": {"BTC": 50000.0}, "usdcBalance": 1000.0,
+        "tierAssignments": {"BTC": 1},
+    })
+    assert status == 200 and "decisions" in result
@@ -0,0 +1,127 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from autotrader import DEFAULT_TIERS, backtest, evaluate_snapshot
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+from backtest_autotrader import load_prices  # noqa: E402
+
+HERE = os.path.dirname(__file__)
+PRICES_CSV = os.path.join(HERE, "data", "prices_1h.csv")
+HARNESS = os.path.join(HERE, "autotrader_harness.js")
+
+ASSIGNMENTS = {"BTC": 1, "SOL": 1, "DOGE": 2, "PEPE": 3}
+
+needs_node = pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+
+
+def trader_state(first_quotes, tier_active=None):
+    """trader_state as the browser saves it, targets started from first_quotes"""
+    targets = {}
+    for coin, price in first_quotes.items():
+        dev = DEFAULT_TIERS[f"tier{ASSIGNMENTS[coin]}"]["deviation"] / 100.0
+        targets[coin] = {"buy": price * (1 - dev), "sell": price * (1 + dev)}
+    return {
+        "autoTiers": dict(DEFAULT_TIERS),
+        "autoTierAssignments": dict(ASSIGNMENTS),
+        "autoCooldowns": {},
+        "autoActive": {
+            "isActive": True,
+            "tierActive": tier_active or {"1": True, "2": True, "3": True},
+            "targets": targets,
+        },
+    }
+
+
+def run_js(state, coins, timestamps, prices, usdc, balances):
+    payload = {
+        "state": state, "coins": coins, "timestamps": [int(t) for t in timestamps],
+        "prices": [[None if np.isnan(p) else float(p) for p in row] for row in prices],
+        "usdc": usdc, "balances": balances,
+    }
+    out = subprocess.run(["node", HARNESS], input=json.dumps(payload),
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+@pytest.fixture(scope="module")
+def series():
+    coins, timestamps, prices = load_prices(PRICES_CSV)
+    first = {c: float(prices[~np.isnan(prices[:, j]), j][0]) for j, c in enumerate(coins)}
+    return coins, timestamps, prices, first
+
+
+@needs_node
+def test_backtest_matches_js_check_loop(series):
+    coins, timestamps, prices, first = series
+    state = trader_state(first)
+    balances = {"BTC": 0.05, "SOL": 20.0, "DOGE": 5000.0, "PEPE": 50_000_000.0}
+
+    py = backtest(state, coins, timestamps, prices, 5000.0,
+                  np.array([balances[c] for c in coins]))
+    js = run_js(state, coins, timestamps, prices, 5000.0, balances)
+
+    tick_of = {int(t): i for i, t in enumerate(timestamps)}
+    py_trades = [(tick_of[t["timestamp"]], t["coin"], t["side"]) for t in py["trades"]]
+    js_trades = [(t["tick"], t["coin"], t["side"]) for t in js["trades"]]
+    # Same trades in the same ticks; order within a tick follows each loop's coin order
+    assert sorted(py_trades) == sorted(js_trades)
+    assert len(py_trades) > 10
+
+    py_qty = {(tick_of[t["timestamp"]], t["coin"]): t["quantity"] for t in py["trades"]}
+    for t in js["trades"]:
+        assert py_qty[(t["tick"], t["coin"])] == pytest.approx(t["quantity"], rel=1e-6)
+
+
+@needs_node
+@pytest.mark.parametrize("tick", [72, 130])  # mostly buys / all sells
+def test_evaluate_snapshot_matches_js_single_check(series, tick):
+    coins, timestamps, prices, first = series
+    state = trader_state(first)
+    quotes = {c: float(prices[tick, j]) for j, c in enumerate(coins) if not np.isnan(prices[tick, j])}
+    balances = {"BTC": 0.05, "SOL": 20.0, "DOGE": 5000.0, "PEPE": 50_000_000.0}
+
+    result = evaluate_snapshot(state, quotes, 5000.0, balances, float(timestamps[tick]))
+    js = run_js(state, coins, timestamps[tick:tick + 1], prices[tick:tick + 1], 5000.0, balances)
+
+    assert result["decisions"]
+    assert sorted((d["coin"], d["side"]) for d in result["decisions"]) == \
+        sorted((t["coin"], t["side"]) for t in js["trades"])
+    for coin, target in js["targets"].items():
+        assert result["targets"][coin]["buy"] == pytest.approx(target["buy"])
+        assert result["targets"][coin]["sell"] == pytest.approx(target["sell"])
+
+
+def test_production_shaped_state_trades():
+    # tierActive as the browser saves it (string keys, tier 3 never started)
+    state = trader_state({"BTC": 60000.0, "DOGE": 0.2}, tier_active={"1": True, "2": True})
+    result = evaluate_snapshot(state, {"BTC": 50000.0, "DOGE": 0.1}, 5000.0, {}, 0.0)
+
+    assert [(d["coin"], d["side"], d["tier"]) for d in result["decisions"]] == \
+        [("BTC", "BUY", 1), ("DOGE", "BUY", 2)]
+
+
+def test_missing_assignments_default_from_holdings():
+    state = trader_state({"BTC": 60000.0, "DOGE": 0.2})
+    del state["autoTierAssignments"]
+    result = evaluate_snapshot(state, {"BTC": 50000.0, "DOGE": 0.1}, 5000.0,
+                               {"BTC": 0.1, "DOGE": 0.0}, 0.0)
+
+    # Like _ensureDefaultAssignments(): only held coins get a tier
+    assert [(d["coin"], d["tier"]) for d in result["decisions"]] == [("BTC", 1)]
+
+
+def test_reserve_is_charged_cumulatively():
+    # The browser checks each buy against the pre-check balance alone (both
+    # would pass: 120 - 12 >= 100); the engine stops once the running total
+    # would breach the reserve
+    state = trader_state({"BTC": 60000.0, "SOL": 150.0})
+    result = evaluate_snapshot(state, {"BTC": 50000.0, "SOL": 100.0}, 120.0, {}, 0.0)
+
+    assert [(d["coin"], d["amount"]) for d in result["decisions"]] == [("BTC", 12.0)]
@@ -0,0 +1,76 @@
+import json
+import urllib.request
+from datetime import datetime, timedelta
+
+import pytest
+
+
+def seed_ledger(db):
+    t0 = datetime(2026, 1, 1)
+    db.deposits_collection.insert_many([
+        {"userId": f"W{i}", "amount": 1.0, "txHash": f"t{i}",
+         "timestamp": t0 + timedelta(minutes=i), "status": "completed"}
+        for i in range(3)
+    ])
+    db.withdrawals_collection.insert_many([
+        {"userId": "W1", "amount": 1.0, "timestamp": t0 + timedelta(minutes=5), "status": "completed"},
+        {"userId": "W1", "amount": 9.0, "timestamp": t0 + timedelta(minutes=6), "status": "pending"},
+    ])
+
+
+def test_ndjson_export_ends_with_trailer(db):
+    seed_ledger(db)
+    lines = [json.loads(line) for line in db.iter_ledger_lines(db.iter_ledger(), "ndjson")]
+
+    assert [r["type"] for r in lines] == ["deposit"] * 3 + ["withdrawal", "end"]
+    assert lines[-1] == {"type": "end", "rows": 4}
+
+
+def test_csv_trailer_counts_resumed_rows(db):
+    seed_ledger(db)
+    rows = list(db.iter_ledger())
+    body = "".join(db.iter_ledger_lines(iter(rows[2:]), "csv", header=False, rows_before=2))
+
+    last = body.splitlines()[-1].split(",")
+    assert last[0] == "end"
+    assert last[db.LEDGER_FIELDS.index("id")] == "rows=4"
+
+
+def test_stream_without_trailer_on_error(db):
+    def failing_rows():
+        yield {"type": "deposit"}
+        raise RuntimeError("cursor died")
+
+    lines = []
+    try:
+        for line in db.iter_ledger_lines(failing_rows(), "ndjson"):
+            lines.append(line)
+    except RuntimeError:
+        pass
+    assert len(lines) == 1 and '"end"' not in lines[0]
+
+
+@pytest.mark.parametrize("value,expected", [
+    (None, None),
+    ("", None),
+    ("2026-01-01", datetime(2026, 1, 1)),
+    ("2026-01-01T10:30:00Z", datetime(2026, 1, 1, 10, 30)),
+    ("2026-01-01T10:30:00+10:00", datetime(2026, 1, 1, 0, 30)),
+])
+def test_parse_ledger_time(db, value, expected):
+    assert db.parse_ledger_time(value) == expected
+
+
+def test_export_route_time_range(api, db, admin):
+    seed_ledger(db)
+    wallet, _ = admin
+    path = f"/api/admin/export?wallet={wallet}&from=2026-01-01T00:01:00Z&to=2026-01-01T11:05:00%2B11:00"
+
+    with urllib.request.urlopen(api.base_url + path) as resp:
+        lines = [json.loads(line) for line in resp.read().decode().splitlines()]
+    assert [(r["type"], r["timestamp"]) for r in lines[:-1]] == [
+        ("deposit", "2026-01-01T00:01:00"), ("deposit", "2026-01-01T00:02:00"),
+    ]
+
+    status, body = api("GET", f"/api/admin/export?wallet={wallet}&from=yesterday")
+    assert (status, body["error"]) == (400, "from/to must be ISO 8601 timestamps")
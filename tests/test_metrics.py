@@ -0,0 +1,104 @@
+import re
+import time
+import urllib.request
+from types import SimpleNamespace
+
+import pytest
+
+import metrics
+from metrics import RequestStats, RouteMetrics, percentiles
+
+
+def stats_with(db_ms=0.0, commands=0, slowest=(0.0, None)):
+    stats = RequestStats("GET /x")
+    stats.db_ms, stats.commands = db_ms, commands
+    stats.slowest_ms, stats.slowest_command = slowest
+    return stats
+
+
+def test_server_timing_header():
+    stats = RequestStats("GET /x")
+    stats.started = time.perf_counter() - 0.25
+    stats.add("find", 1.5)
+    stats.add("aggregate", 4.25)
+    stats.add("find", 0.5)
+
+    db, app, slowest = stats.server_timing().split(", ")
+    assert db == 'db;dur=6.25;desc="3 cmds"'
+    assert re.fullmatch(r"app;dur=\d+\.\d\d", app) and float(app.split("=")[1]) >= 250.0
+    assert slowest == 'db-slowest;dur=4.25;desc="aggregate"'
+
+
+def test_server_timing_without_commands():
+    header = RequestStats("GET /x").server_timing()
+    assert re.fullmatch(r'db;dur=0\.00;desc="0 cmds", app;dur=\d+\.\d\d', header)
+
+
+def testpercentiles():
+    assert percentiles([]) == {"p50": 0, "p90": 0, "p99": 0, "max": 0}
+    assert percentiles(iter([7.0])) == {"p50": 7.0, "p90": 7.0, "p99": 7.0, "max": 7.0}
+    # Nearest rank over 0..100, in any input order
+    assert percentiles(reversed(range(101))) == {"p50": 50, "p90": 90, "p99": 99, "max": 100}
+    assert percentiles([0.5, 0.12345]) == {"p50": 0.123, "p90": 0.5, "p99": 0.5, "max": 0.5}
+    assert percentiles([1.23456])["p50"] == 1.235
+
+
+def test_route_window_keeps_latest_samples():
+    window = RouteMetrics(window=3)
+    for i in range(5):
+        window.record("GET /x", stats_with(db_ms=float(i), commands=i, slowest=(float(i), f"c{i}")))
+
+    route = window.snapshot()["routes"]["GET /x"]
+    assert (route["requests"], route["windowSize"]) == (5, 3)
+    assert route["dbMs"] == {"p50": 3.0, "p90": 4.0, "p99": 4.0, "max": 4.0}
+    assert route["commands"]["max"] == 4
+    assert route["slowestCommand"] == {"command": "c4", "ms": 4.0}
+    assert window.snapshot()["window"] == 3
+
+
+def test_routes_are_kept_apart_and_reset():
+    window = RouteMetrics(window=10)
+    window.record("GET /a", stats_with(commands=1))
+    window.record("POST /b", stats_with(commands=5))
+
+    routes = window.snapshot()["routes"]
+    assert list(routes) == ["GET /a", "POST /b"]
+    assert (routes["GET /a"]["commands"]["max"], routes["POST /b"]["commands"]["max"]) == (1, 5)
+
+    window.reset()
+    assert window.snapshot()["routes"] == {}
+
+
+def test_listener_attributes_commands_to_current_request(monkeypatch):
+    monkeypatch.setattr(metrics, "route_metrics", RouteMetrics())
+    event = SimpleNamespace(command_name="find", database_name="flub", duration_micros=2500)
+
+    metrics.command_listener.succeeded(event)  # no request on this thread: ignored
+    metrics.begin_request("GET /x")
+    metrics.command_listener.succeeded(event)
+    metrics.command_listener.failed(event)
+    stats = metrics.end_request("GET /x (routed)")
+
+    assert (stats.commands, stats.db_ms) == (2, 5.0)
+    assert metrics.current_request() is None
+    assert metrics.route_metrics.snapshot()["routes"]["GET /x (routed)"]["requests"] == 1
+
+
+def test_admin_metrics_route(api, db, admin):
+    wallet, _ = admin
+    assert api("GET", "/api/admin/metrics?wallet=someone")[0] == 403
+
+    api("GET", f"/api/admin/metrics?wallet={wallet}&reset=1")
+    with urllib.request.urlopen(api.base_url + "/api/pool/state") as resp:
+        assert resp.headers["Server-Timing"].startswith('db;dur=')
+        assert 'desc="1 cmds"' in resp.headers["Server-Timing"]
+
+    status, snapshot = api("GET", f"/api/admin/metrics?wallet={wallet}&reset=1")
+    assert status == 200
+    pool = snapshot["routes"]["GET /api/pool/state"]
+    assert (pool["requests"], pool["commands"]["max"]) == (1, 1)
+    assert pool["slowestCommand"]["command"] == "find"
+
+    # reset=1 returned the window above, then cleared it
+    status, snapshot = api("GET", f"/api/admin/metrics?wallet={wallet}")
+    assert "GET /api/pool/state" not in snapshot["routes"]
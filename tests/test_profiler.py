@@ -0,0 +1,76 @@
+import json
+import os
+import time
+
+import profiler
+from profiler import SamplingProfiler, prune, redact
+
+
+def saved_ids(directory):
+    return sorted({os.path.splitext(name)[0] for name in os.listdir(directory)})
+
+
+def test_redact_removes_nested_signatures():
+    body = {
+        "walletAddress": "W1",
+        "signature": [1, 2, 3],
+        "approval": {"adminWallet": "A1", "signature": [4, 5]},
+        "batch": [{"signature": [6], "amount": 1.0}, "plain", [{"signature": [7]}]],
+    }
+
+    assert redact(body) == {
+        "walletAddress": "W1",
+        "approval": {"adminWallet": "A1"},
+        "batch": [{"amount": 1.0}, "plain", [{}]],
+    }
+    assert body["signature"] == [1, 2, 3]  # caller's body is untouched
+
+
+def test_save_writes_redacted_body(tmp_path):
+    prof = SamplingProfiler()
+    profile_id = prof.save("POST", "/api/withdraw", {"a": "1"}, "admin", directory=str(tmp_path),
+                           body={"amount": 5.0, "signature": [1], "adminSignature": [2]})
+
+    with open(tmp_path / f"{profile_id}.json") as f:
+        sidecar = json.load(f)
+    assert sidecar["body"] == {"amount": 5.0}
+    assert (sidecar["method"], sidecar["path"], sidecar["params"]) == ("POST", "/api/withdraw", {"a": "1"})
+    assert (tmp_path / f"{profile_id}.collapsed").exists()
+
+
+def test_prune_keeps_newest(tmp_path):
+    for i in range(5):
+        for ext in (".json", ".collapsed"):
+            (tmp_path / f"2026010{i}T000000000000-GET-x{ext}").write_text("")
+    (tmp_path / "20260109T000000000000-GET-x.json").write_text("")  # sidecar without stacks
+
+    prune(str(tmp_path), keep=2)
+
+    assert saved_ids(tmp_path) == ["20260104T000000000000-GET-x", "20260109T000000000000-GET-x"]
+    assert len(os.listdir(tmp_path)) == 3
+
+
+def test_save_caps_profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler, "PROFILE_MAX_FILES", 3)
+    ids = []
+    for i in range(6):
+        ids.append(SamplingProfiler().save("GET", f"/api/r{i}", {}, "sampled", directory=str(tmp_path)))
+        time.sleep(0.001)
+
+    assert saved_ids(tmp_path) == ids[-3:]
+    assert len(os.listdir(tmp_path)) == 6  # .json + .collapsed each
+
+
+def test_profiled_request_redacts_body(api, db, admin, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler, "PROFILE_DIR", str(tmp_path))
+    wallet, _ = admin
+    status, _ = api("POST", f"/api/withdraw?profile={wallet}",
+                    {"walletAddress": "W1", "signature": [1] * 64, "adminSignature": [3],
+                     "nested": {"signature": [2]}})
+    assert status == 403
+
+    (profile_id,) = saved_ids(tmp_path)
+    with open(tmp_path / f"{profile_id}.json") as f:
+        sidecar = json.load(f)
+    assert sidecar["body"] == {"walletAddress": "W1", "nested": {}}
+    assert sidecar["params"] == {} and sidecar["trigger"] == "admin"
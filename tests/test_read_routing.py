@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+import pytest
+
+API_DIR = os.path.join(os.path.dirname(__file__), "..", "api")
+
+
+def test_unknown_read_preference_rejected(db):
+    with pytest.raises(ValueError, match="Unknown read preference"):
+        db.configure_read_routes({"get_leaderboard": "secondaryprefered"})
+    assert db.READ_ROUTES["get_leaderboard"] != "secondaryprefered"
+
+
+def test_unknown_route_name_rejected(db):
+    with pytest.raises(ValueError, match="Unknown read route 'get_leaderbord'"):
+        db.configure_read_routes({"get_leaderbord": "primary"})
+    assert "get_leaderbord" not in db.READ_ROUTES
+
+
+@pytest.mark.parametrize("value,error", [
+    ("get_leaderbord=primary", "Unknown read route"),
+    ("get_leaderboard=secondaryprefered", "Unknown read preference"),
+])
+def test_bad_read_routes_env_fails_at_import(value, error):
+    env = dict(os.environ, READ_ROUTES=value)
+    out = subprocess.run([sys.executable, "-c", "import database"], cwd=API_DIR, env=env,
+                         capture_output=True, text=True)
+    assert out.returncode != 0 and error in out.stderr
+
+
+def test_read_routes_env_applied():
+    env = dict(os.environ, READ_ROUTES=" get_leaderboard = primary ,get_admin_stats=nearest")
+    code = "import database; print(database.READ_ROUTES['get_leaderboard'], database.READ_ROUTES['get_admin_stats'])"
+    out = subprocess.run([sys.executable, "-c", code], cwd=API_DIR, env=env,
+                         capture_output=True, text=True, check=True)
+    assert out.stdout.split() == ["primary", "nearest"]
+
+
+def spy_reads(db, monkeypatch):
+    """Collection names passed through _read from now on"""
+    routed = []
+    real_read = db._read
+
+    def spy(collection, route):
+        routed.append(collection.name)
+        return real_read(collection, route)
+
+    monkeypatch.setattr(db, "_read", spy)
+    return routed
+
+
+@pytest.mark.parametrize("fn", ["get_leaderboard", "get_admin_stats"])
+def test_pool_state_never_routed(db, monkeypatch, fn):
+    routed = spy_reads(db, monkeypatch)
+    getattr(db, fn)(1000.0)
+
+    assert "users" in routed
+    assert "pool_state" not in routed
+
+
+def test_ledger_export_reads_primary(db, monkeypatch):
+    # Checkpoints must never come from a lagging secondary
+    db.deposits_collection.insert_one({"userId": "W1", "amount": 1.0, "txHash": "t1",
+                                       "timestamp": datetime(2026, 1, 1), "status": "completed"})
+    routed = spy_reads(db, monkeypatch)
+
+    assert len(list(db.iter_ledger())) == 1
+    assert routed == []
@@ -0,0 +1,368 @@
+# ==========================================
+# Storage backend parity
+# ==========================================
+# Runs the same operations on MemoryStorage and MongoStorage and checks both
+# against the results MongoDB gives. The Mongo run needs a server:
+#   FLUB_TEST_MONGODB_URI=mongodb://localhost:27017/ python -m pytest tests
+# (it uses, and drops, the flub_test_storage database). Without it only the
+# memory backend runs, against the same expectations.
+# ==========================================
+
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+import database
+from storage import MemoryStorage, MongoStorage
+
+MONGO_URI = os.environ.get("FLUB_TEST_MONGODB_URI")
+T0 = datetime(2026, 1, 1)
+
+
+@pytest.fixture(params=["memory", "mongo"])
+def backend(request):
+    if request.param == "memory":
+        store = MemoryStorage()
+    elif not MONGO_URI:
+        pytest.skip("FLUB_TEST_MONGODB_URI not set")
+    else:
+        store = MongoStorage(MONGO_URI, "flub_test_storage")
+    store.drop()
+    store.ensure_indexes()
+    yield store
+    store.drop()
+
+
+@pytest.fixture
+def flub(backend):
+    """database.py bound to the backend under test"""
+    previous = database.use_storage(backend)
+    yield database
+    database.use_storage(previous)
+
+
+@pytest.fixture
+def coll(backend):
+    docs = [
+        {"k": "a", "n": 1, "tags": ["x", "y"], "nested": {"v": 1}, "active": True},
+        {"k": "b", "n": 2, "tags": ["y"], "active": False},
+        {"k": "c", "n": 3, "nested": {"v": 3}},
+        {"k": "d", "n": None},
+        {"k": "e", "n": "5"},
+        {"k": "f"},
+    ]
+    collection = backend.collection("parity")
+    collection.insert_many(docs)
+    return collection
+
+
+def keys(docs):
+    return sorted(d["k"] for d in docs)
+
+
+# ── queries ──
+
+@pytest.mark.parametrize("query,expected", [
+    ({}, "abcdef"),
+    ({"n": 2}, "b"),
+    ({"n": None}, "df"),  # null matches missing fields too
+    ({"n": {"$gt": 1}}, "bc"),  # no cross-type comparison with "5"
+    ({"n": {"$gte": 1, "$lt": 3}}, "ab"),
+    ({"n": {"$lte": "5"}}, "e"),
+    ({"n": {"$ne": None}}, "abce"),
+    ({"n": {"$in": [1, 3]}}, "ac"),
+    ({"n": {"$nin": [1, 3]}}, "bdef"),
+    ({"n": {"$in": [None]}}, "df"),
+    ({"n": {"$exists": False}}, "f"),
+    ({"nested.v": 3}, "c"),
+    ({"nested.v": {"$exists": True}}, "ac"),
+    ({"tags": "y"}, "ab"),  # equality matches array elements
+    ({"tags": {"$in": ["x"]}}, "a"),
+    ({"active": {"$ne": True}}, "bcdef"),
+    ({"$or": [{"n": 1}, {"active": False}]}, "ab"),
+    ({"$and": [{"n": {"$gte": 2}}, {"n": {"$lte": 3}}]}, "bc"),
+    ({"k": {"$gt": "b"}, "$or": [{"n": 3}, {"n": {"$exists": False}}]}, "cf"),
+])
+def test_find_operators(coll, query, expected):
+    assert keys(coll.find(query)) == list(expected)
+    assert coll.count_documents(query) == len(expected)
+
+
+def test_sort_skip_limit(coll):
+    # BSON order: null/missing < numbers < strings
+    asc = [d["k"] for d in coll.find({}).sort([("n", 1), ("k", 1)])]
+    assert asc == ["d", "f", "a", "b", "c", "e"]
+
+    desc = [d["k"] for d in coll.find({}).sort([("n", -1), ("k", 1)])]
+    assert desc == ["e", "c", "b", "a", "d", "f"]
+
+    page = coll.find({}).sort([("n", 1), ("k", 1)]).skip(1).limit(2)
+    assert [d["k"] for d in page] == ["f", "a"]
+
+    assert coll.find_one({}, sort=[("k", -1)])["k"] == "f"
+
+
+def test_projection(coll):
+    doc = coll.find_one({"k": "a"}, {"n": 1})
+    assert set(doc) == {"_id", "n"}
+
+    assert coll.find_one({"k": "a"}, {"n": 1, "_id": 0}) == {"n": 1}
+    assert coll.find_one({"k": "a"}, {"nested.v": 1, "_id": 0}) == {"nested": {"v": 1}}
+    assert coll.find_one({"k": "a"}, {"_id": 0, "tags": 0, "nested": 0}) == \
+        {"k": "a", "n": 1, "active": True}
+    assert coll.find_one({"k": "b"}, {"nested.v": 1, "_id": 0}) == {}
+
+
+def test_results_are_copies(coll):
+    doc = coll.find_one({"k": "a"})
+    doc["nested"]["v"] = 99
+    doc["tags"].append("z")
+    assert coll.find_one({"k": "a"}, {"_id": 0, "nested": 1, "tags": 1}) == \
+        {"nested": {"v": 1}, "tags": ["x", "y"]}
+
+
+def test_insert_sets_id_and_truncates_datetimes(backend):
+    collection = backend.collection("parity")
+    doc = {"k": "t", "at": datetime(2026, 1, 1, 12, 0, 0, 123456)}
+    result = collection.insert_one(doc)
+
+    assert isinstance(doc["_id"], ObjectId) and doc["_id"] == result.inserted_id
+    assert collection.find_one({"_id": doc["_id"]})["at"] == datetime(2026, 1, 1, 12, 0, 0, 123000)
+
+
+# ── updates ──
+
+def test_update_operators(coll):
+    result = coll.update_one({"k": "a"}, {
+        "$set": {"deep.er": 1, "n": 10},
+        "$inc": {"holdings.SOL": 2.5, "nested.v": 1},
+        "$unset": {"tags": ""},
+    })
+    assert (result.matched_count, result.modified_count) == (1, 1)
+    assert coll.find_one({"k": "a"}, {"_id": 0}) == {
+        "k": "a", "n": 10, "nested": {"v": 2}, "active": True,
+        "deep": {"er": 1}, "holdings": {"SOL": 2.5},
+    }
+
+    # Setting the stored value again matches but modifies nothing
+    result = coll.update_one({"k": "a"}, {"$set": {"n": 10}})
+    assert (result.matched_count, result.modified_count) == (1, 0)
+
+    result = coll.update_many({"n": {"$gte": 2}}, {"$inc": {"n": 1}})
+    assert (result.matched_count, result.modified_count) == (3, 3)
+    assert [d["n"] for d in coll.find({"k": {"$in": ["a", "b", "c"]}}).sort("k", 1)] == [11, 3, 4]
+
+    result = coll.update_many({"k": "zz"}, {"$set": {"n": 1}})
+    assert (result.matched_count, result.upserted_id) == (0, None)
+
+
+def test_upsert_seeds_from_filter(backend):
+    collection = backend.collection("parity")
+    result = collection.update_one(
+        {"_id": "admin_state", "kind": "trader"},
+        {"$set": {"tiers": {"tier1": 5}}, "$setOnInsert": {"created": T0}},
+        upsert=True,
+    )
+    assert result.upserted_id == "admin_state"
+    assert collection.find_one({"_id": "admin_state"}) == {
+        "_id": "admin_state", "kind": "trader", "tiers": {"tier1": 5}, "created": T0,
+    }
+
+    # $setOnInsert only applies when the upsert inserts
+    collection.update_one(
+        {"_id": "admin_state"},
+        {"$set": {"tiers": {"tier1": 6}}, "$setOnInsert": {"created": T0 + timedelta(days=1)}},
+        upsert=True,
+    )
+    assert collection.find_one({"_id": "admin_state"})["created"] == T0
+    assert collection.count_documents({}) == 1
+
+
+def test_find_one_and_update(backend):
+    users = backend.collection("users")
+    users.insert_one({"walletAddress": "W1", "shares": 100.0, "totalWithdrawn": 0.0})
+
+    before = users.find_one_and_update(
+        {"walletAddress": "W1", "shares": {"$gte": 40.0}},
+        {"$inc": {"shares": -40.0, "totalWithdrawn": 40.0}},
+    )
+    assert before["shares"] == 100.0
+
+    after = users.find_one_and_update(
+        {"walletAddress": "W1", "shares": {"$gte": 40.0}},
+        {"$inc": {"shares": -40.0, "totalWithdrawn": 40.0}},
+        projection={"_id": 0, "shares": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    assert after == {"shares": 20.0}
+
+    # Conditional burn fails once the balance is too low
+    assert users.find_one_and_update(
+        {"walletAddress": "W1", "shares": {"$gte": 40.0}}, {"$inc": {"shares": -40.0}},
+    ) is None
+    assert users.find_one({"walletAddress": "W1"})["shares"] == 20.0
+
+    created = users.find_one_and_update(
+        {"walletAddress": "W2"}, {"$set": {"shares": 1.0}},
+        upsert=True, return_document=ReturnDocument.AFTER,
+    )
+    assert (created["walletAddress"], created["shares"]) == ("W2", 1.0)
+
+
+def test_delete_many(coll):
+    assert coll.delete_many({"n": {"$in": [1, 2]}}).deleted_count == 2
+    assert keys(coll.find({})) == list("cdef")
+
+
+# ── unique indexes ──
+
+def test_duplicate_wallet_address(backend):
+    users = backend.collection("users")
+    users.insert_one({"walletAddress": "W1", "shares": 0.0})
+
+    with pytest.raises(DuplicateKeyError):
+        users.insert_one({"walletAddress": "W1", "shares": 5.0})
+
+    users.insert_one({"walletAddress": "W2", "shares": 0.0})
+    with pytest.raises(DuplicateKeyError):
+        users.update_one({"walletAddress": "W2"}, {"$set": {"walletAddress": "W1"}})
+
+    assert sorted(u["walletAddress"] for u in users.find({})) == ["W1", "W2"]
+    assert users.find_one({"walletAddress": "W1"})["shares"] == 0.0
+
+
+def test_duplicate_tx_hash(backend):
+    deposits = backend.collection("deposits")
+    deposits.insert_one({"userId": "W1", "txHash": "0xabc", "amount": 1.0})
+
+    with pytest.raises(DuplicateKeyError):
+        deposits.insert_one({"userId": "W2", "txHash": "0xabc", "amount": 9.0})
+
+    # txHash is not sparse: a missing hash counts as null, and only one may exist
+    deposits.insert_one({"userId": "W1", "amount": 2.0})
+    with pytest.raises(DuplicateKeyError):
+        deposits.insert_one({"userId": "W1", "txHash": None, "amount": 3.0})
+
+    assert deposits.count_documents({}) == 2
+
+
+def test_withdrawal_nonce_index_is_sparse(backend):
+    withdrawals = backend.collection("withdrawals")
+    withdrawals.insert_many([{"userId": "W1", "amount": 1.0}, {"userId": "W1", "amount": 2.0}])
+    withdrawals.insert_one({"userId": "W1", "nonce": "W1:n1"})
+
+    with pytest.raises(DuplicateKeyError):
+        withdrawals.insert_one({"userId": "W1", "nonce": "W1:n1"})
+    assert withdrawals.count_documents({"userId": "W1"}) == 3
+
+
+@pytest.mark.parametrize("ordered,stored", [(True, ["W1"]), (False, ["W1", "W2"])])
+def test_insert_many_reports_duplicates(backend, ordered, stored):
+    users = backend.collection("users")
+    with pytest.raises(BulkWriteError) as exc:
+        users.insert_many([{"walletAddress": "W1"}, {"walletAddress": "W1"}, {"walletAddress": "W2"}],
+                          ordered=ordered)
+
+    errors = exc.value.details["writeErrors"]
+    assert [(e["index"], e["code"]) for e in errors] == [(1, 11000)]
+    assert exc.value.details["nInserted"] == len(stored)
+    assert sorted(u["walletAddress"] for u in users.find({})) == stored
+
+
+# ── database.py queries ──
+
+def seed_pool(flub):
+    """Two users, an admin, and history spread over a few minutes"""
+    flub.users_collection.insert_many([
+        {"walletAddress": w, "shares": s, "allocation": 0.0, "totalDeposited": s,
+         "totalWithdrawn": 0.0, "holdings": {}, "joinedDate": T0, "lastLogin": T0,
+         "isActive": active}
+        for w, s, active in [("ADMIN1", 50.0, True), ("WA", 30.0, True),
+                             ("WB", 20.0, True), ("WC", 0.0, False)]
+    ])
+    flub.pool_state_collection.insert_one({"_id": "pool", "totalShares": 100.0, "initialized": T0})
+    flub.deposits_collection.insert_many([
+        {"userId": w, "amount": a, "currency": "USDC", "txHash": f"tx{i}", "shares": a,
+         "nav": 1.0, "timestamp": T0 + timedelta(minutes=i), "status": "completed"}
+        for i, (w, a) in enumerate([("ADMIN1", 50.0), ("WA", 30.0), ("WB", 20.0)])
+    ])
+    flub.trades_collection.insert_many([
+        {"coin": "SOL", "type": "buy", "amount": 1.0, "price": 150.0,
+         "timestamp": T0 + timedelta(minutes=3), "userAllocations": {"WA": 0.6, "WB": 0.4}},
+        {"coin": "SOL", "type": "sell", "amount": 1.0, "price": 160.0,
+         "timestamp": T0 + timedelta(minutes=5), "userAllocations": {"WA": 1.0}},
+    ])
+    flub.withdrawals_collection.insert_many([
+        {"userId": "WA", "amount": 5.0, "currency": "USDC", "shares": 5.0, "nav": 1.0,
+         "timestamp": T0 + timedelta(minutes=4), "status": "completed"},
+        {"userId": "WB", "amount": 9.0, "currency": "USDC", "shares": 9.0, "nav": 1.0,
+         "timestamp": T0 + timedelta(minutes=6), "status": "pending", "nonce": "WB:n1"},
+    ])
+
+
+def test_leaderboard_and_positions(flub):
+    seed_pool(flub)
+    board = flub.get_leaderboard(200.0)  # NAV 2.0
+
+    assert [(u["walletAddress"], u["currentValue"]) for u in board] == [("WA", 60.0), ("WB", 40.0)]
+
+    positions = flub.get_user_positions(["WA", "WC", "nobody"], 200.0)
+    assert positions["WA"]["shares"] == 30.0
+    assert positions["WC"]["shares"] == 0.0
+    assert positions["nobody"]["shares"] == 0
+
+
+def test_admin_stats_counts(flub):
+    seed_pool(flub)
+    stats = flub.get_admin_stats(200.0)
+
+    assert stats["userCount"] == 2
+    assert stats["totalShares"] == 100.0
+    # Admin deposits and the pending withdrawal are left out
+    assert (stats["tradeCount"], stats["depositCount"], stats["withdrawalCount"]) == (2, 2, 1)
+    assert stats["lastDepositAmount"] == 20.0
+
+
+def test_transactions(flub):
+    seed_pool(flub)
+
+    user = flub.get_all_transactions("WB")
+    assert [t["type"] for t in user] == ["deposit"]
+
+    admin = flub.get_all_transactions("ADMIN1", True)
+    assert [t["type"] for t in admin] == \
+        ["sell", "withdrawal", "buy", "deposit", "deposit", "deposit"]
+
+
+def test_active_users_page(flub):
+    seed_pool(flub)
+
+    first = flub.get_active_users_page(2, fields=["walletAddress", "shares"])
+    assert [u["walletAddress"] for u in first["users"]] == ["ADMIN1", "WA"]
+
+    rest = flub.get_active_users_page(2, after=first["nextCursor"], fields=["walletAddress"])
+    assert [u["walletAddress"] for u in rest["users"]] == ["WB"]
+    assert rest["nextCursor"] is None
+
+
+def test_ledger_queries(flub):
+    seed_pool(flub)
+
+    rows = list(flub.iter_ledger())
+    assert [r["type"] for r in rows] == \
+        ["deposit", "deposit", "deposit", "trade", "withdrawal", "trade"]
+
+    # Resuming from every checkpoint yields exactly the remaining rows
+    for i, row in enumerate(rows):
+        assert [r["id"] for r in flub.iter_ledger(after=row["checkpoint"])] == \
+            [r["id"] for r in rows[i + 1:]]
+
+    window = flub.iter_ledger(start=T0 + timedelta(minutes=1), end=T0 + timedelta(minutes=4))
+    assert [r["type"] for r in window] == ["deposit", "deposit", "trade"]
+
+    wallet = list(flub.iter_ledger(wallet="WB"))
+    assert [(r["type"], r["allocation"]) for r in wallet] == [("deposit", None), ("trade", 0.4)]
@@ -0,0 +1,104 @@
+from datetime import datetime
+
+import pytest
+
+WALLETS = ["W1", "W2", "W3", "W4", "W5"]
+
+
+@pytest.fixture
+def users(db):
+    db.users_collection.insert_many([
+        {"walletAddress": w, "shares": float(i), "allocation": 20.0, "totalDeposited": float(i),
+         "totalWithdrawn": 0.0, "holdings": {"SOL": i}, "joinedDate": datetime(2026, 1, i + 1),
+         "isActive": True}
+        for i, w in enumerate(WALLETS)
+    ] + [{"walletAddress": "ADMIN1", "shares": 9.0, "isActive": True},
+         {"walletAddress": "W0", "shares": 1.0, "isActive": False}])
+    return db
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_limit_below_one_rejected(users, limit):
+    with pytest.raises(ValueError, match="limit must be at least 1"):
+        users.get_active_users_page(limit)
+
+
+def test_limit_capped(users, monkeypatch):
+    monkeypatch.setattr(users, "MAX_USERS_PAGE", 2)
+    assert users.get_active_users_page(100)["count"] == 2
+
+
+def test_unknown_field_rejected(users):
+    with pytest.raises(ValueError, match="Unknown fields: password"):
+        users.get_active_users_page(10, fields=["shares", "password"])
+
+
+def test_columnar_page(users):
+    page = users.get_active_users_page(3, fields=["walletAddress", "role", "shares", "joinedDate"],
+                                       columnar=True)
+
+    assert page == {
+        "columns": {
+            "walletAddress": ["ADMIN1", "W1", "W2"],
+            "role": ["admin", "user", "user"],
+            "shares": [9.0, 0.0, 1.0],
+            "joinedDate": [None, "2026-01-01T00:00:00", "2026-01-02T00:00:00"],
+        },
+        "count": 3,
+        "nextCursor": "W2",
+    }
+
+
+def test_columnar_matches_rows(users):
+    rows = users.get_active_users_page(10)["users"]
+    columns = users.get_active_users_page(10, columnar=True)["columns"]
+
+    assert list(columns) == list(users.USER_FIELDS)
+    assert [dict(zip(columns, values)) for values in zip(*columns.values())] == rows
+
+
+# ── /api/users ──
+
+def test_route_requires_admin(api, users):
+    assert api("GET", "/api/users?admin_wallet=W1&limit=2")[0] == 403
+    assert api("GET", "/api/users")[0] == 403
+
+
+def test_route_without_paging_params_lists_everyone(api, users):
+    status, body = api("GET", "/api/users?admin_wallet=ADMIN1")
+    assert status == 200
+    assert body["count"] == 6 and "nextCursor" not in body
+    assert sorted(u["walletAddress"] for u in body["users"]) == sorted(WALLETS + ["ADMIN1"])
+
+
+def test_route_pages_with_cursor(api, users):
+    seen, after = [], ""
+    while True:
+        status, body = api("GET", f"/api/users?admin_wallet=ADMIN1&limit=4&fields=walletAddress&after={after}")
+        assert status == 200
+        seen += [u["walletAddress"] for u in body["users"]]
+        assert all(list(u) == ["walletAddress"] for u in body["users"])
+        if body["nextCursor"] is None:
+            break
+        after = body["nextCursor"]
+
+    assert seen == ["ADMIN1"] + WALLETS
+
+
+def test_route_columnar_with_encoded_fields(api, users):
+    status, body = api("GET", "/api/users?admin_wallet=ADMIN1&format=columnar&limit=2"
+                              "&fields=walletAddress%2Crole")
+    assert status == 200
+    assert body["columns"] == {"walletAddress": ["ADMIN1", "W1"], "role": ["admin", "user"]}
+
+
+@pytest.mark.parametrize("query,error", [
+    ("limit=0", "limit must be at least 1"),
+    ("limit=-5", "limit must be at least 1"),
+    ("limit=ten", "limit must be an integer"),
+    ("format=xml", "format must be rows or columnar"),
+    ("fields=shares,password", "Unknown fields: password"),
+])
+def test_route_rejects_bad_params(api, users, query, error):
+    status, body = api("GET", f"/api/users?admin_wallet=ADMIN1&{query}")
+    assert (status, body["error"]) == (400, error)
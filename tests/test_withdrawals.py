@@ -0,0 +1,201 @@
+import threading
+import time
+
+import base58
+import pytest
+from nacl.signing import SigningKey
+
+from conftest import ADMIN_KEY, ADMIN_WALLET
+from database import withdrawal_approval_message, withdrawal_message
+
+
+def make_user(db, deposit=100.0, pool_value=100.0):
+    """Registered user holding shares from one deposit; returns (wallet, key)"""
+    key = SigningKey.generate()
+    wallet = base58.b58encode(bytes(key.verify_key)).decode()
+    login = "Sign in to flub"
+    db.register_user(wallet, list(key.sign(login.encode()).signature), login)
+    db.record_deposit(wallet, deposit, f"tx-{wallet}", pool_value)
+    return wallet, key
+
+
+def authorize(key, wallet, amount, nonce, issued_at=None, currency="USDC"):
+    """(signature, issued_at) for withdrawal_message(...)"""
+    issued_at = issued_at or int(time.time() * 1000)
+    message = withdrawal_message(wallet, amount, currency, nonce, issued_at)
+    return list(key.sign(message.encode()).signature), issued_at
+
+
+def approve(wallet, amount, pool_value, nonce, key=ADMIN_KEY, currency="USDC"):
+    """Admin signature over withdrawal_approval_message(...)"""
+    message = withdrawal_approval_message(wallet, amount, currency, pool_value, nonce)
+    return list(key.sign(message.encode()).signature)
+
+
+def redeem(db, wallet, amount, pool_value, signature, nonce, issued_at):
+    """record_withdrawal with a genuine admin approval"""
+    return db.record_withdrawal(wallet, amount, pool_value, signature, nonce, issued_at,
+                                ADMIN_WALLET, approve(wallet, amount, pool_value, nonce))
+
+
+def withdraw(db, wallet, key, amount, pool_value, nonce="n1", **kwargs):
+    signature, issued_at = authorize(key, wallet, amount, nonce, kwargs.pop("issued_at", None))
+    return redeem(db, wallet, amount, pool_value, signature, nonce, issued_at)
+
+
+def shares_of(db, wallet):
+    return db.users_collection.find_one({"walletAddress": wallet})["shares"]
+
+
+def test_withdrawal_burns_shares_at_nav(db):
+    wallet, key = make_user(db)  # pool: 100 bootstrap shares + 100 user shares
+    result = withdraw(db, wallet, key, 50.0, 400.0)  # NAV 2.0
+
+    assert result["shares"] == pytest.approx(25.0)
+    assert result["userShares"] == pytest.approx(75.0)
+    assert db.get_pool_state()["totalShares"] == pytest.approx(175.0)
+
+    row = db.withdrawals_collection.find_one({"userId": wallet})
+    assert row["status"] == "completed"
+    assert sorted(t["type"] for t in db.get_all_transactions(wallet)) == ["deposit", "withdrawal"]
+
+
+def test_login_signature_cannot_authorize_withdrawal(db):
+    wallet, key = make_user(db)
+    login = "Sign in to flub"
+    login_sig = list(key.sign(login.encode()).signature)
+
+    with pytest.raises(ValueError, match="Invalid signature"):
+        redeem(db, wallet, 50.0, 200.0, login_sig, "n1", int(time.time() * 1000))
+    assert shares_of(db, wallet) == pytest.approx(100.0)
+
+
+def test_signature_is_bound_to_amount(db):
+    wallet, key = make_user(db)
+    signature, issued_at = authorize(key, wallet, 10.0, "n1")
+
+    with pytest.raises(ValueError, match="Invalid signature"):
+        redeem(db, wallet, 100.0, 200.0, signature, "n1", issued_at)
+
+
+def test_authorization_is_single_use(db):
+    wallet, key = make_user(db)
+    signature, issued_at = authorize(key, wallet, 10.0, "n1")
+    redeem(db, wallet, 10.0, 200.0, signature, "n1", issued_at)
+
+    with pytest.raises(ValueError, match="already used"):
+        redeem(db, wallet, 10.0, 200.0, signature, "n1", issued_at)
+    assert shares_of(db, wallet) == pytest.approx(90.0)
+
+
+def test_forged_admin_wallet_rejected(db):
+    # Admin addresses are public: a user naming one and signing the approval
+    # with their own key must not get to pick the NAV
+    wallet, key = make_user(db)
+    signature, issued_at = authorize(key, wallet, 50.0, "n1")
+    forged = approve(wallet, 50.0, 1e12, "n1", key=key)
+
+    with pytest.raises(PermissionError):
+        db.record_withdrawal(wallet, 50.0, 1e12, signature, "n1", issued_at, ADMIN_WALLET, forged)
+    with pytest.raises(PermissionError):
+        db.record_withdrawal(wallet, 50.0, 1e12, signature, "n1", issued_at, wallet, forged)
+    assert shares_of(db, wallet) == pytest.approx(100.0)
+    assert db.withdrawals_collection.count_documents({}) == 0
+
+
+def test_admin_approval_is_bound_to_pool_value(db):
+    wallet, key = make_user(db)
+    signature, issued_at = authorize(key, wallet, 50.0, "n1")
+    approval = approve(wallet, 50.0, 200.0, "n1")
+
+    with pytest.raises(PermissionError):
+        db.record_withdrawal(wallet, 50.0, 1e12, signature, "n1", issued_at, ADMIN_WALLET, approval)
+    assert shares_of(db, wallet) == pytest.approx(100.0)
+
+
+def test_withdraw_route_rejects_forged_admin(api, db):
+    wallet, key = make_user(db)
+    signature, issued_at = authorize(key, wallet, 50.0, "n1")
+    body = {
+        "walletAddress": wallet, "amount": 50.0, "totalPoolValue": 1e12,
+        "signature": signature, "nonce": "n1", "issuedAt": issued_at,
+        "adminWallet": ADMIN_WALLET, "adminSignature": approve(wallet, 50.0, 1e12, "n1", key=key),
+    }
+
+    status, result = api("POST", "/api/withdraw", body)
+    assert (status, result["error"]) == (403, "Admin approval required")
+    assert shares_of(db, wallet) == pytest.approx(100.0)
+
+    body["totalPoolValue"] = 200.0
+    body["adminSignature"] = approve(wallet, 50.0, 200.0, "n1")
+    status, result = api("POST", "/api/withdraw", body)
+    assert status == 200 and result["shares"] == pytest.approx(50.0)
+
+
+def test_expired_authorization_rejected(db):
+    wallet, key = make_user(db)
+    stale = int((time.time() - db.WITHDRAW_AUTH_TTL_SECONDS - 5) * 1000)
+
+    with pytest.raises(ValueError, match="expired"):
+        withdraw(db, wallet, key, 10.0, 200.0, issued_at=stale)
+
+
+@pytest.mark.parametrize("amount,pool_value", [
+    (float("nan"), 200.0), (float("inf"), 200.0), (-5.0, 200.0),
+    (10.0, float("nan")), (10.0, float("inf")), (10.0, 0.0),
+])
+def test_non_finite_inputs_rejected(db, amount, pool_value):
+    wallet, key = make_user(db)
+    with pytest.raises(ValueError):
+        redeem(db, wallet, amount, pool_value, [0] * 64, "n1", int(time.time() * 1000))
+    assert shares_of(db, wallet) == pytest.approx(100.0)
+
+
+def test_insufficient_shares_leaves_position_untouched(db):
+    wallet, key = make_user(db)  # position worth 100 at NAV 1.0
+
+    with pytest.raises(ValueError, match="Insufficient shares"):
+        withdraw(db, wallet, key, 150.0, 200.0)
+
+    assert shares_of(db, wallet) == pytest.approx(100.0)
+    assert db.get_pool_state()["totalShares"] == pytest.approx(200.0)
+    assert db.withdrawals_collection.count_documents({"status": "completed"}) == 0
+
+
+def test_full_exit_absorbs_float_rounding(db):
+    wallet, key = make_user(db)
+    pool_value = 300.0  # NAV 1.5, position worth 150
+    displayed = 100.0 * (pool_value / 200.0) * (1 + 1e-12)
+
+    result = withdraw(db, wallet, key, displayed, pool_value)
+
+    assert result["shares"] == 100.0
+    assert shares_of(db, wallet) == 0.0
+    assert result["amount"] == pytest.approx(150.0)
+    assert db.get_pool_state()["totalShares"] == pytest.approx(100.0)
+
+
+def test_concurrent_burns_cannot_overdraw(db):
+    wallet, key = make_user(db)
+    requests = [authorize(key, wallet, 60.0, f"n{i}") + (f"n{i}",) for i in range(8)]
+    results, errors = [], []
+    barrier = threading.Barrier(len(requests))
+
+    def run(signature, issued_at, nonce):
+        barrier.wait()
+        try:
+            results.append(redeem(db, wallet, 60.0, 200.0, signature, nonce, issued_at))
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=run, args=r) for r in requests]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(results) == 1
+    assert errors == ["Insufficient shares"] * 7
+    assert shares_of(db, wallet) == pytest.approx(40.0)
+    assert db.get_pool_state()["totalShares"] == pytest.approx(140.0)
+    assert db.withdrawals_collection.count_documents({"status": "completed"}) == 1